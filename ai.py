@@ -12,40 +12,19 @@ class AIPlayer(Player):
 
     def _score_direction(self, ang: float, look_dist: float, game_map) -> float:
         """Score a direction based on several lookahead checks."""
-        distances = [look_dist * f for f in (0.5, 1.0, 1.5)]
-        score = 0.0
-        for dist in distances:
-            lx = self.x + math.sin(ang) * dist
-            ly = self.y - math.cos(ang) * dist
-            tile = game_map.char_at(lx / 5.0, ly / 5.0)
-            if tile == 'o':
-                score -= 5
-            else:
-                score += 1
-                if tile == 'B':
-                    score += 3
-                if tile == 'J':
-                    score += 2
-                if tile == 'H' and self.health < 80:
-                    score += 2
-        return score / len(distances)
-
-    def update_ai(self, game_map):
-        # Extend look distance so AI better anticipates upcoming turns
-        look_dist = 5.0
-        angles = [-0.6, -0.3, 0.0, 0.3, 0.6]
-        scores = [self._score_direction(self.angle + a, look_dist, game_map) for a in angles]
-        best_idx = scores.index(max(scores))
-        if angles[best_idx] < 0:
+        return score_direction(self.x, self.y, self.health, ang, look_dist, game_map)
+
+    def decide(self, game_map):
+        """Return this tick's ``(turn, throttle)`` without changing any state."""
+        return decide(self.x, self.y, self.angle, self.health, game_map)
+
+    def apply_decision(self, turn: int, throttle: bool, game_map) -> bool:
+        """Steer and throttle as decided, then move; return True on a wall hit."""
+        if turn < 0:
             self.turn_left()
-        elif angles[best_idx] > 0:
+        elif turn > 0:
             self.turn_right()
-
-        # throttle only if the path ahead is clear
-        front_x = self.x + math.sin(self.angle) * look_dist
-        front_y = self.y - math.cos(self.angle) * look_dist
-        front = game_map.char_at(front_x / 5.0, front_y / 5.0)
-        self.throttle = front != 'o'
+        self.throttle = throttle
         prev_x, prev_y = self.x, self.y
         super().update()
         tile = game_map.char_at(self.x / 5.0, self.y / 5.0)
@@ -53,14 +32,69 @@ class AIPlayer(Player):
             self.x = prev_x
             self.y = prev_y
             self.speed = 0
+            return True
+        return False
+
+    def update_ai(self, game_map) -> bool:
+        return self.apply_decision(*self.decide(game_map), game_map)
+
+
+def score_direction(x: float, y: float, health: float, ang: float, look_dist: float, game_map) -> float:
+    """Score a direction from ``(x, y)`` based on several lookahead checks."""
+    distances = [look_dist * f for f in (0.5, 1.0, 1.5)]
+    score = 0.0
+    for dist in distances:
+        lx = x + math.sin(ang) * dist
+        ly = y - math.cos(ang) * dist
+        tile = game_map.char_at(lx / 5.0, ly / 5.0)
+        if tile == 'o':
+            score -= 5
+        else:
+            score += 1
+            if tile == 'B':
+                score += 3
+            if tile == 'J':
+                score += 2
+            if tile == 'H' and health < 80:
+                score += 2
+    return score / len(distances)
+
+
+def decide(x: float, y: float, angle: float, health: float, game_map):
+    """Pick steering (-1, 0, 1) and throttle for an AI racer.
+
+    Pure function of the racer state and map so it can run in another
+    process; :meth:`AIPlayer.apply_decision` applies the result.
+    """
+    # Extend look distance so AI better anticipates upcoming turns
+    look_dist = 5.0
+    angles = [-0.6, -0.3, 0.0, 0.3, 0.6]
+    scores = [score_direction(x, y, health, angle + a, look_dist, game_map) for a in angles]
+    best_idx = scores.index(max(scores))
+    turn = 0
+    if angles[best_idx] < 0:
+        turn = -1
+        angle -= 0.1  # same arithmetic as Player.turn_left
+    elif angles[best_idx] > 0:
+        turn = 1
+        angle += 0.1
+
+    # throttle only if the path ahead is clear
+    front_x = x + math.sin(angle) * look_dist
+    front_y = y - math.cos(angle) * look_dist
+    front = game_map.char_at(front_x / 5.0, front_y / 5.0)
+    return turn, front != 'o'
 
 
 class AIOrchestrator:
     """Adjust overall AI difficulty to keep the race interesting."""
 
-    def __init__(self, player: Player, ai_players: list):
+    def __init__(self, player: Player, ai_players: list, telemetry=None):
         self.player = player
         self.ai_players = ai_players
+        self.telemetry = telemetry
+        # last BASE_ACCEL sent to telemetry per AI racer
+        self._recorded_accel = [None] * len(ai_players)
 
     def _progress(self, racer, game_map) -> float:
         start_x = game_map.start_x * 5.0
@@ -72,10 +106,22 @@ class AIOrchestrator:
         ai_progs = [self._progress(ai, game_map) for ai in self.ai_players]
         best_ai = max(ai_progs) if ai_progs else 0.0
 
-        for ai in self.ai_players:
+        for idx, ai in enumerate(self.ai_players):
             if player_prog - best_ai > 20:
                 ai.BASE_ACCEL = min(0.03, ai.BASE_ACCEL + 0.005)
             elif best_ai - player_prog > 20:
                 ai.BASE_ACCEL = max(0.015, ai.BASE_ACCEL - 0.005)
-            ai.update_ai(game_map)
+            hit = self._drive(idx, ai, game_map)
+            if self.telemetry:
+                # racer 0 is the player, AI racers follow; only adjustments
+                # go in the ring so it keeps a long history
+                if ai.BASE_ACCEL != self._recorded_accel[idx]:
+                    self._recorded_accel[idx] = ai.BASE_ACCEL
+                    self.telemetry.record_ai_accel(idx + 1, ai.BASE_ACCEL)
+                if hit:
+                    self.telemetry.record_wall_hit(idx + 1)
+
+    def _drive(self, idx: int, ai: AIPlayer, game_map) -> bool:
+        """Move one AI racer; return True if it hit a wall."""
+        return ai.update_ai(game_map)
 
@@ -0,0 +1,202 @@
+"""Run AI decisions in worker processes over shared-memory racer state.
+
+The map grid and the racer state live in ``multiprocessing.shared_memory``
+blocks. Each worker owns a contiguous shard of racers and writes a
+``(turn, throttle)`` decision per racer; the main process only applies the
+results with :meth:`AIPlayer.apply_decision`. State and results are double
+buffered so the decisions for the next tick can be computed while the
+current tick renders.
+"""
+import multiprocessing
+from multiprocessing import shared_memory
+
+from ai import AIOrchestrator, decide
+
+# Per-racer state fields the decision depends on.
+STATE_FIELDS = 4  # x, y, angle, health
+RESULT_FIELDS = 2  # turn, throttle
+SLOTS = 2
+
+
+class GridMap:
+    """Read-only ``char_at`` over a shared byte grid, matching ``Map.char_at``."""
+
+    def __init__(self, buf, width: int, height: int):
+        self.buf = buf
+        self.width = width
+        self.height = height
+
+    def char_at(self, x, y):
+        ix, iy = int(x), int(y)
+        if 0 <= iy < self.height and 0 <= ix < self.width:
+            return chr(self.buf[iy * self.width + ix])
+        return 'o'  # treat out-of-bounds as wall
+
+
+def encode_grid(game_map) -> bytes:
+    """Pack a map into one byte per tile, padding short rows with wall."""
+    rows = []
+    for line in game_map.lines:
+        # only 'o' and trigger tiles matter to the AI; anything wider than a byte is road
+        row = ''.join(ch if ord(ch) < 256 else ' ' for ch in line)
+        rows.append(row.ljust(game_map.width, 'o'))
+    return ''.join(rows).encode('latin-1')
+
+
+def _worker_main(conn, state_name, result_name, count, start, end):
+    state_shm = shared_memory.SharedMemory(name=state_name)
+    result_shm = shared_memory.SharedMemory(name=result_name)
+    state = state_shm.buf.cast('d')
+    results = result_shm.buf.cast('d')
+    grid_shm = None
+    grid = None
+    try:
+        while True:
+            msg = conn.recv()
+            if msg[0] == 'stop':
+                break
+            if msg[0] == 'map':
+                _, name, width, height = msg
+                grid = None
+                if grid_shm is not None:
+                    grid_shm.close()
+                grid_shm = shared_memory.SharedMemory(name=name)
+                grid = GridMap(grid_shm.buf, width, height)
+                continue
+            _, slot = msg
+            base = slot * count
+            for i in range(start, end):
+                s = (base + i) * STATE_FIELDS
+                turn, throttle = decide(state[s], state[s + 1], state[s + 2], state[s + 3], grid)
+                r = (base + i) * RESULT_FIELDS
+                results[r] = turn
+                results[r + 1] = 1.0 if throttle else 0.0
+            conn.send(slot)
+    finally:
+        grid = None
+        state.release()
+        results.release()
+        state_shm.close()
+        result_shm.close()
+        if grid_shm is not None:
+            grid_shm.close()
+
+
+class ShardedAIOrchestrator(AIOrchestrator):
+    """:class:`AIOrchestrator` that computes AI decisions in worker processes.
+
+    Decisions match the in-process path exactly: workers evaluate the same
+    pure :func:`ai.decide` on the same float64 state and map tiles.
+    """
+
+    def __init__(self, player, ai_players: list, game_map, workers: int = 2, telemetry=None):
+        super().__init__(player, ai_players, telemetry)
+        count = len(ai_players)
+        self._count = count
+        self._state_shm = shared_memory.SharedMemory(
+            create=True, size=max(8, SLOTS * count * STATE_FIELDS * 8))
+        self._result_shm = shared_memory.SharedMemory(
+            create=True, size=max(8, SLOTS * count * RESULT_FIELDS * 8))
+        self._state = self._state_shm.buf.cast('d')
+        self._results = self._result_shm.buf.cast('d')
+        self._grid_shm = None
+        self._map_version = None
+        self._slot = 0
+        self._pending = None  # slot whose decisions are being computed
+        self._decisions = None
+        self._workers = []
+        workers = max(1, min(workers, count)) if count else 0
+        ctx = multiprocessing.get_context()
+        for w in range(workers):
+            start = count * w // workers
+            end = count * (w + 1) // workers
+            parent, child = ctx.Pipe()
+            proc = ctx.Process(
+                target=_worker_main,
+                args=(child, self._state_shm.name, self._result_shm.name, count, start, end),
+                daemon=True,
+            )
+            proc.start()
+            child.close()
+            self._workers.append((proc, parent))
+        self._sync_map(game_map)
+
+    def _sync_map(self, game_map):
+        data = encode_grid(game_map)
+        old = self._grid_shm
+        self._grid_shm = shared_memory.SharedMemory(create=True, size=max(1, len(data)))
+        self._grid_shm.buf[:len(data)] = data
+        for _, conn in self._workers:
+            conn.send(('map', self._grid_shm.name, game_map.width, game_map.height))
+        if old is not None:
+            # workers attach to the new block before they read again
+            old.close()
+            old.unlink()
+        self._map_version = game_map.version
+
+    def _dispatch(self):
+        slot = self._slot
+        base = slot * self._count
+        state = self._state
+        for i, ai in enumerate(self.ai_players):
+            s = (base + i) * STATE_FIELDS
+            state[s] = ai.x
+            state[s + 1] = ai.y
+            state[s + 2] = ai.angle
+            state[s + 3] = ai.health
+        for _, conn in self._workers:
+            conn.send(('tick', slot))
+        self._pending = slot
+        self._slot = 1 - slot
+
+    def _collect(self):
+        slot = self._pending
+        for _, conn in self._workers:
+            conn.recv()
+        self._pending = None
+        base = slot * self._count
+        results = self._results
+        self._decisions = [
+            (int(results[(base + i) * RESULT_FIELDS]), results[(base + i) * RESULT_FIELDS + 1] != 0.0)
+            for i in range(self._count)
+        ]
+
+    def update(self, game_map):
+        if game_map.version != self._map_version:
+            # decisions in flight were made on the old map
+            if self._pending is not None:
+                self._collect()
+            self._sync_map(game_map)
+        if self._pending is None:
+            self._dispatch()
+        self._collect()
+        super().update(game_map)
+        # start the next tick's decisions while the caller renders this one
+        if self._workers:
+            self._dispatch()
+
+    def _drive(self, idx, ai, game_map):
+        turn, throttle = self._decisions[idx]
+        return ai.apply_decision(turn, throttle, game_map)
+
+    def close(self):
+        if self._pending is not None:
+            self._collect()
+        for proc, conn in self._workers:
+            try:
+                conn.send(('stop',))
+            except OSError:
+                pass
+        for proc, conn in self._workers:
+            proc.join(timeout=1.0)
+            if proc.is_alive():
+                proc.terminate()
+            conn.close()
+        self._workers = []
+        self._state.release()
+        self._results.release()
+        for shm in (self._state_shm, self._result_shm, self._grid_shm):
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+        self._grid_shm = None
@@ -0,0 +1,298 @@
+"""Render the race once and fan the frames out to many local viewers.
+
+A spectator camera is rendered into an off-screen :class:`FrameBuffer`,
+encoded once as an ANSI diff against the previous frame, and the same bytes
+are written to every viewer connected to a Unix socket. Viewers that join
+late or fall behind are resynchronised with a keyframe; a viewer whose
+socket is still busy simply skips frames instead of stalling the loop.
+"""
+import curses
+import math
+import os
+import socket
+import sys
+import time
+
+from ai import AIPlayer
+
+ANSI_COLORS = {
+    'BLACK': 0, 'RED': 1, 'GREEN': 2, 'YELLOW': 3,
+    'BLUE': 4, 'MAGENTA': 5, 'CYAN': 6, 'WHITE': 7,
+}
+CLEAR = b'\x1b[0m\x1b[H\x1b[2J'
+# Seconds the camera stays on one racer in ``cycle`` mode.
+CYCLE_SECONDS = 5.0
+
+
+class FrameBuffer:
+    """Minimal off-screen stand-in for a curses window."""
+
+    def __init__(self, height: int, width: int):
+        self.height = height
+        self.width = width
+        self.erase()
+
+    def getmaxyx(self):
+        return self.height, self.width
+
+    def erase(self):
+        self.chars = [[' '] * self.width for _ in range(self.height)]
+        self.attrs = [[0] * self.width for _ in range(self.height)]
+
+    def addch(self, y, x, ch, attr=0):
+        if 0 <= y < self.height and 0 <= x < self.width:
+            self.chars[y][x] = chr(ch) if isinstance(ch, int) else ch
+            self.attrs[y][x] = attr
+
+    def addstr(self, y, x, text, attr=0):
+        for i, ch in enumerate(text):
+            self.addch(y, x + i, ch, attr)
+
+    def refresh(self):
+        pass
+
+    def frame(self):
+        """Return an immutable copy of the buffer: one ``(chars, attrs)`` per row."""
+        return [(''.join(c), tuple(a)) for c, a in zip(self.chars, self.attrs)]
+
+
+class FrameEncoder:
+    """Turn frames into ANSI byte streams."""
+
+    def __init__(self, pairs: dict, pair_of=None):
+        self.pairs = pairs
+        self.pair_of = pair_of or curses.pair_number
+        self._sgr = {}
+
+    def sgr(self, attr: int) -> str:
+        code = self._sgr.get(attr)
+        if code is None:
+            fg, bg = self.pairs.get(self.pair_of(attr), ('WHITE', 'BLACK'))
+            code = f'\x1b[{30 + ANSI_COLORS[fg]};{40 + ANSI_COLORS[bg]}m'
+            self._sgr[attr] = code
+        return code
+
+    def _cells(self, out, chars, attrs, y, start, end, cur_attr):
+        out.append(f'\x1b[{y + 1};{start + 1}H')
+        for x in range(start, end):
+            if attrs[x] != cur_attr:
+                cur_attr = attrs[x]
+                out.append(self.sgr(cur_attr))
+            out.append(chars[x])
+        return cur_attr
+
+    def keyframe(self, frame) -> bytes:
+        out = []
+        cur_attr = None
+        for y, (chars, attrs) in enumerate(frame):
+            cur_attr = self._cells(out, chars, attrs, y, 0, len(chars), cur_attr)
+        return CLEAR + ''.join(out).encode('utf-8')
+
+    def diff(self, prev, cur) -> bytes:
+        """Encode only the runs of cells that changed between two frames."""
+        out = []
+        cur_attr = None
+        for y, (row, old) in enumerate(zip(cur, prev)):
+            if row == old:
+                continue
+            chars, attrs = row
+            old_chars, old_attrs = old
+            x = 0
+            width = len(chars)
+            while x < width:
+                if chars[x] == old_chars[x] and attrs[x] == old_attrs[x]:
+                    x += 1
+                    continue
+                start = x
+                while x < width and (chars[x] != old_chars[x] or attrs[x] != old_attrs[x]):
+                    x += 1
+                cur_attr = self._cells(out, chars, attrs, y, start, x, cur_attr)
+        return ''.join(out).encode('utf-8')
+
+
+def _shape(frame):
+    return len(frame), len(frame[0][0]) if frame else 0
+
+
+class Viewer:
+    def __init__(self, sock):
+        self.sock = sock
+        self.pending = b''
+        self.stale = True  # needs a keyframe before it can take diffs
+        self.frames = 0
+        self.skipped = 0
+
+    def flush(self) -> bool:
+        """Write as much pending data as the socket accepts; False if closed."""
+        while self.pending:
+            try:
+                sent = self.sock.send(self.pending)
+            except BlockingIOError:
+                return True
+            except OSError:
+                return False
+            self.pending = self.pending[sent:]
+        return True
+
+
+class Broadcaster:
+    """Accept viewers on a Unix socket and hand each encoded frame to all of them."""
+
+    def __init__(self, path: str, encoder: FrameEncoder):
+        self.path = path
+        self.encoder = encoder
+        self.viewers = []
+        self._prev = None
+        if os.path.exists(path):
+            os.unlink(path)
+        self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._listener.bind(path)
+        self._listener.listen()
+        self._listener.setblocking(False)
+
+    def accept(self):
+        while True:
+            try:
+                sock, _ = self._listener.accept()
+            except BlockingIOError:
+                return
+            sock.setblocking(False)
+            self.viewers.append(Viewer(sock))
+
+    def publish(self, frame):
+        """Send ``frame`` to every viewer that is ready for it."""
+        self.accept()
+        diff = key = None
+        # a size change invalidates every viewer's screen
+        resync = self._prev is None or _shape(self._prev) != _shape(frame)
+        alive = []
+        for viewer in self.viewers:
+            if not viewer.flush():
+                viewer.sock.close()
+                continue
+            alive.append(viewer)
+            if viewer.pending:
+                # still writing an older frame: drop this one and resync later
+                viewer.stale = True
+                viewer.skipped += 1
+                continue
+            if viewer.stale or resync:
+                if key is None:
+                    key = self.encoder.keyframe(frame)
+                viewer.pending = memoryview(key)
+                viewer.stale = False
+            else:
+                if diff is None:
+                    diff = self.encoder.diff(self._prev, frame)
+                viewer.pending = memoryview(diff)
+            viewer.frames += 1
+            if not viewer.flush():
+                viewer.sock.close()
+                alive.pop()
+        self.viewers = alive
+        self._prev = frame
+
+    def close(self):
+        for viewer in self.viewers:
+            viewer.sock.close()
+        self.viewers = []
+        self._listener.close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+def race_progress(racer, game_map, scale: float) -> float:
+    """Rough race position: completed laps first, then distance from the start."""
+    dist = math.hypot(racer.x - game_map.start_x * scale, racer.y - game_map.start_y * scale)
+    return racer.lap * 1e6 + dist
+
+
+class SpectatorCamera:
+    """Pick which racer the broadcast follows."""
+
+    def __init__(self, racers, mode: str = 'leader', cycle_seconds: float = CYCLE_SECONDS):
+        if mode not in ('leader', 'cycle'):
+            raise ValueError(f"unknown camera mode: {mode}")
+        self.racers = racers
+        self.mode = mode
+        self.cycle_seconds = cycle_seconds
+        self._index = 0
+        self._switched = None
+
+    def target(self, game_map, scale: float, now: float = None):
+        if self.mode == 'leader':
+            return max(self.racers, key=lambda r: race_progress(r, game_map, scale))
+        now = time.monotonic() if now is None else now
+        if self._switched is None:
+            self._switched = now
+        elif now - self._switched >= self.cycle_seconds:
+            self._index = (self._index + 1) % len(self.racers)
+            self._switched = now
+        return self.racers[self._index]
+
+
+def run_broadcast(stdscr, path: str, height: int = 24, width: int = 80,
+                  mode: str = 'leader', racers: int = 32):
+    """Simulate an AI-only race and stream a spectator view to ``path``."""
+    import game
+    from map_loader import Map
+
+    curses.curs_set(0)
+    stdscr.nodelay(True)
+    game.set_theme(game.THEME)
+
+    game_map = Map.from_file(game.MAP_PATH)
+    start_x = game_map.start_x * game.MAP_SCALE
+    start_y = game_map.start_y * game.MAP_SCALE
+    field = [AIPlayer(x=start_x, y=start_y + i) for i in range(racers)]
+    camera = SpectatorCamera(field, mode)
+    fb = FrameBuffer(height, width)
+    broadcaster = Broadcaster(path, FrameEncoder(game.COLOR_PAIRS))
+    flash = {'x': None, 'y': None, 'timer': 0}
+    try:
+        last_time = time.time()
+        while True:
+            if stdscr.getch() in (ord('q'), ord('Q')):
+                return
+            for ai in field:
+                prev_y = ai.y
+                ai.update_ai(game_map)
+                if prev_y < start_y <= ai.y:
+                    ai.complete_lap()
+            target = camera.target(game_map, game.MAP_SCALE)
+            others = [r for r in field if r is not target]
+            fb.erase()
+            game.draw_scene(fb, game_map, target, flash, ai_players=others)
+            broadcaster.publish(fb.frame())
+
+            stdscr.erase()
+            status = f"Broadcasting on {path}: {len(broadcaster.viewers)} viewer(s)  [q] quit"
+            stdscr.addstr(0, 0, status[:max(0, stdscr.getmaxyx()[1] - 1)])
+            stdscr.refresh()
+
+            elapsed = time.time() - last_time
+            time.sleep(max(0, game.FRAME_DELAY - elapsed))
+            last_time = time.time()
+    finally:
+        broadcaster.close()
+
+
+def watch(path: str):
+    """Connect to a broadcast and copy the stream to this terminal."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(path)
+    out = sys.stdout.buffer
+    out.write(b'\x1b[?25l')
+    try:
+        while True:
+            data = sock.recv(65536)
+            if not data:
+                break
+            out.write(data)
+            out.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        out.write(b'\x1b[0m\x1b[?25h')
+        out.flush()
+        sock.close()
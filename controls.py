@@ -0,0 +1,279 @@
+import collections
+import curses
+import os
+import select
+import threading
+import time
+
+ESC = 0x1b
+# Arrow key escape sequences (normal and keypad-transmit mode), reported
+# with the curses key codes the game already checks for.
+ESCAPE_KEYS = {
+    b'[A': curses.KEY_UP, b'[B': curses.KEY_DOWN, b'[C': curses.KEY_RIGHT, b'[D': curses.KEY_LEFT,
+    b'OA': curses.KEY_UP, b'OB': curses.KEY_DOWN, b'OC': curses.KEY_RIGHT, b'OD': curses.KEY_LEFT,
+}
+
+
+class EventRing:
+    """Fixed-size ring of timestamped key events.
+
+    Only the reader thread advances ``_head`` and only the consumer advances
+    ``_tail``, so a single producer and a single consumer can share the ring
+    without a lock. When the ring is full new events are dropped and counted.
+    """
+
+    def __init__(self, capacity: int = 256):
+        self.capacity = capacity
+        self._keys = [0] * capacity
+        self._stamps = [0.0] * capacity
+        self._head = 0
+        self._tail = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return self._head - self._tail
+
+    def push(self, key: int, stamp: float) -> bool:
+        head = self._head
+        if head - self._tail >= self.capacity:
+            self.dropped += 1
+            return False
+        idx = head % self.capacity
+        self._keys[idx] = key
+        self._stamps[idx] = stamp
+        # publish the slot only after it has been written
+        self._head = head + 1
+        return True
+
+    def drain(self, out: list) -> int:
+        """Append all pending ``(key, stamp)`` pairs to ``out``."""
+        tail = self._tail
+        head = self._head
+        for i in range(tail, head):
+            idx = i % self.capacity
+            out.append((self._keys[idx], self._stamps[idx]))
+        self._tail = head
+        return head - tail
+
+
+class TerminalReader:
+    """Blocking ``getch`` over a raw terminal file descriptor.
+
+    curses is not thread-safe, so the input thread reads the terminal's fd
+    directly instead of calling ``getch`` while the main thread refreshes.
+    Bytes are decoded into key codes, with the arrow escape sequences mapped
+    to the curses ``KEY_*`` values; ``-1`` means no key arrived within
+    ``timeout`` seconds.
+    """
+
+    def __init__(self, fd: int, timeout: float = 0.05):
+        self.fd = fd
+        self.timeout = timeout
+        self._buf = b''
+        self._keys = collections.deque()
+
+    def getch(self) -> int:
+        if self._keys:
+            return self._keys.popleft()
+        ready, _, _ = select.select([self.fd], [], [], self.timeout)
+        if ready:
+            data = os.read(self.fd, 64)
+            if not data:
+                time.sleep(self.timeout)  # stdin closed
+                return -1
+            self._buf += data
+            self._decode(final=False)
+        elif self._buf:
+            # nothing followed the escape byte: it was a lone Esc
+            self._decode(final=True)
+        return self._keys.popleft() if self._keys else -1
+
+    def _decode(self, final: bool):
+        buf = self._buf
+        i = 0
+        while i < len(buf):
+            if buf[i] == ESC:
+                seq = buf[i + 1:i + 3]
+                key = ESCAPE_KEYS.get(seq)
+                if key is not None:
+                    self._keys.append(key)
+                    i += 3
+                    continue
+                if not final and len(seq) < 2 and seq[:1] in (b'', b'[', b'O'):
+                    break  # the rest of the sequence has not arrived yet
+            self._keys.append(buf[i])
+            i += 1
+        self._buf = buf[i:]
+
+
+class KeyState:
+    """Track which keys count as held.
+
+    Terminals only report key presses: a held key sends one press, waits
+    out the terminal's repeat delay, then auto-repeats. Each key keeps its
+    own last press time and repeat interval. After a lone press the key is
+    held for ``hold`` seconds, enough to bridge the repeat delay; once it
+    repeats it is released ``decay`` repeat intervals (at least
+    ``min_release`` seconds) after its last press, so letting go is noticed
+    quickly. A press only ever extends its own key.
+    """
+
+    def __init__(self, hold: float = 0.5, decay: float = 3.0, min_release: float = 0.05):
+        self.hold = hold
+        self.decay = decay
+        self.min_release = min_release
+        self._last = {}  # key -> time of its last press
+        self._interval = {}  # key -> seconds between its auto-repeats
+        self._deadlines = {}
+
+    def press(self, key: int, stamp: float):
+        last = self._last.get(key)
+        self._last[key] = stamp
+        if last is not None and stamp - last < self.hold:
+            interval = stamp - last
+            self._interval[key] = interval
+            # slow taps never stay held longer than a lone press
+            release = min(self.hold, max(self.min_release, interval * self.decay))
+            self._deadlines[key] = stamp + release
+        else:
+            self._interval.pop(key, None)
+            self._deadlines[key] = stamp + self.hold
+
+    def repeat_interval(self, key: int):
+        """Measured auto-repeat interval of ``key``, or ``None`` before it repeats."""
+        return self._interval.get(key)
+
+    def expire(self, now: float):
+        expired = [k for k, d in self._deadlines.items() if d <= now]
+        for k in expired:
+            del self._deadlines[k]
+            self._interval.pop(k, None)
+
+    def held(self) -> frozenset:
+        return frozenset(self._deadlines)
+
+
+class InputSnapshot:
+    """Input state handed to the simulation for a single tick."""
+
+    __slots__ = ('tick', 'time', 'held', 'pressed', 'oldest')
+
+    def __init__(self, tick, stamp, held, pressed, oldest):
+        self.tick = tick
+        self.time = stamp
+        self.held = held
+        self.pressed = pressed
+        self.oldest = oldest  # timestamp of the earliest event in this tick
+
+    def is_held(self, *keys) -> bool:
+        return any(k in self.held for k in keys)
+
+    def was_pressed(self, *keys) -> bool:
+        return any(k in self.pressed for k in keys)
+
+
+class LatencyTracker:
+    """Keep the most recent input-to-present latencies in a fixed buffer."""
+
+    def __init__(self, size: int = 512):
+        self.size = size
+        self._samples = [0.0] * size
+        self.count = 0
+        self.last = None
+
+    def record(self, seconds: float):
+        self._samples[self.count % self.size] = seconds
+        self.count += 1
+        self.last = seconds
+
+    def samples(self) -> list:
+        n = min(self.count, self.size)
+        return self._samples[:n]
+
+    @property
+    def mean(self) -> float:
+        samples = self.samples()
+        return sum(samples) / len(samples) if samples else 0.0
+
+    @property
+    def max(self) -> float:
+        samples = self.samples()
+        return max(samples) if samples else 0.0
+
+    def percentile(self, pct: float) -> float:
+        samples = sorted(self.samples())
+        if not samples:
+            return 0.0
+        idx = min(len(samples) - 1, int(len(samples) * pct / 100.0))
+        return samples[idx]
+
+
+class InputSystem:
+    """Read keys on a background thread and hand out per-tick snapshots.
+
+    ``getch`` should block for a short timeout and return ``-1`` when no key
+    is available (e.g. a curses window with ``timeout()`` set) so the thread
+    can notice :meth:`stop`.
+    """
+
+    def __init__(self, getch, hold: float = 0.5, decay: float = 3.0,
+                 capacity: int = 256, clock=time.monotonic):
+        self._getch = getch
+        self._clock = clock
+        self.ring = EventRing(capacity)
+        self.keys = KeyState(hold, decay)
+        self.latency = LatencyTracker()
+        self.tick = 0
+        self._pending = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='input-reader', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                key = self._getch()
+            except Exception:  # noqa: BLE001
+                # curses raises on interrupted reads; keep the reader alive
+                continue
+            if key == -1:
+                continue
+            self.ring.push(key, self._clock())
+
+    def feed(self, key: int, stamp: float = None):
+        """Queue a key event directly, bypassing the reader thread."""
+        self.ring.push(key, self._clock() if stamp is None else stamp)
+
+    def snapshot(self) -> InputSnapshot:
+        """Consume queued events and return the input state for this tick."""
+        events = self._pending
+        events.clear()
+        self.ring.drain(events)
+        now = self._clock()
+        for key, stamp in events:
+            self.keys.press(key, stamp)
+        self.keys.expire(now)
+        pressed = tuple(k for k, _ in events)
+        oldest = events[0][1] if events else None
+        snap = InputSnapshot(self.tick, now, self.keys.held(), pressed, oldest)
+        self.tick += 1
+        return snap
+
+    def presented(self, snapshot: InputSnapshot, stamp: float = None):
+        """Record latency once the frame built from ``snapshot`` is on screen."""
+        if snapshot.oldest is None:
+            return
+        now = self._clock() if stamp is None else stamp
+        self.latency.record(now - snapshot.oldest)
@@ -1,11 +1,18 @@
+import argparse
 import curses
 import time
 import math
+import os
 import sys
 
-from map_loader import Map
+from map_loader import Map, MapWatcher
 from player import Player
 from ai import AIPlayer, AIOrchestrator
+from ai_workers import ShardedAIOrchestrator
+from controls import InputSystem, TerminalReader
+from telemetry import JsonlExporter, MetricsServer, Telemetry
+from theme import (CLASS_STRIDE, KIND_CHECKER, KIND_FLASH, KIND_SHADED, SHADES, SKY_TABLE_SIZE,
+                   cell_index, load_themes)
 
 try:
     import keyboard as keylib  # optional library for better key state tracking
@@ -28,12 +35,36 @@ CAMERA_OFFSET = 2.0
 MAP_SCALE = 5.0
 MINIMAP_MAX_SIZE = 10
 
+# Terminals only report presses, so a key counts as held for this many
+# seconds after a lone press (bridging the terminal's repeat delay)...
+KEY_HOLD_TIME = 0.5
+# ...and, once it auto-repeats, for this many repeat intervals after its
+# last press.
+KEY_REPEAT_DECAY = 3.0
+# How long the input thread blocks in getch before checking for shutdown.
+INPUT_POLL_MS = 50
+
 # Portion of the screen above the horizon line. Reducing this effectively
 # pitches the camera downward so more of the track is visible. The previous
 # value of one third left a lot of empty space, so tilt the camera down by
 # roughly fifteen degrees by moving the horizon higher on the screen.
 HORIZON_RATIO = 0.18
 
+# Wall renderer: 'flat' samples walls like floor tiles, 'raycast' casts one
+# ray per column and extrudes solid tiles into vertical strips.
+WALL_RENDERER = 'flat'
+# Height of extruded walls in world units.
+WALL_HEIGHT = 8.0
+
+# Floor reprojection: reuse last frame's floor samples while the camera
+# moves less than this many world units or radians between frames.
+FLOOR_CACHE = False
+FLOOR_CACHE_MAX_MOVE = 2 * MAP_SCALE
+FLOOR_CACHE_MAX_TURN = 0.25
+
+THEME_DIR = 'themes'
+MAP_PATH = 'sample_map.txt'
+
 
 def enter_fullscreen():
     """Switch terminal to the alternate buffer."""
@@ -68,20 +99,79 @@ def load_ascii_art(path):
 
 BACKGROUND = load_background('sample_background.txt')
 TITLE_ART = load_ascii_art('title.txt')
-BG_COLOR_MAP = {
-    '|': 13,
-    '_': 13,
-    'x': 13,
-    '\\': 14,
-    'X': 14,
-    'o': 15,
-    '!': 6,
-    '~': 3,
-    '*': 14,
-    '.': 17,
+THEMES = load_themes(THEME_DIR)
+THEME = THEMES[0]
+
+
+COLOR_PAIRS = {
+    1: ('YELLOW', 'BLACK'),    # wall
+    2: ('WHITE', 'BLACK'),     # ship body
+    3: ('WHITE', 'BLACK'),     # road
+    4: ('BLUE', 'BLACK'),      # water
+    5: ('CYAN', 'BLACK'),      # jump pad
+    6: ('MAGENTA', 'BLACK'),   # dirt
+    7: ('WHITE', 'BLACK'),     # start line checker
+    8: ('RED', 'BLACK'),       # flame
+    9: ('BLUE', 'BLACK'),      # boost flame
+    10: ('BLACK', 'BLACK'),    # empty / flash
+    11: ('YELLOW', 'RED'),     # explosion
+    12: ('BLUE', 'BLACK'),     # background blue
+    13: ('WHITE', 'BLACK'),    # grey
+    14: ('YELLOW', 'BLACK'),   # yellow
+    15: ('GREEN', 'BLACK'),    # green
+    16: ('GREEN', 'BLACK'),    # dark green
+    17: ('RED', 'BLACK'),      # blink bright
+    18: ('RED', 'BLACK'),      # blink dark
 }
 
 
+def init_colors(overrides=None):
+    """Start curses colors and register ``COLOR_PAIRS`` plus theme ``overrides``."""
+    curses.start_color()
+    pairs = dict(COLOR_PAIRS)
+    pairs.update(overrides or {})
+    for pair, (fg, bg) in pairs.items():
+        curses.init_pair(pair, getattr(curses, 'COLOR_' + fg), getattr(curses, 'COLOR_' + bg))
+
+
+def set_theme(theme):
+    """Switch the active theme, register its colors and compile its tables."""
+    global THEME
+    THEME = theme
+    init_colors(theme.pairs)
+    theme.compile()
+
+
+def next_theme():
+    """Cycle to the next loaded theme."""
+    set_theme(THEMES[(THEMES.index(THEME) + 1) % len(THEMES)])
+
+
+def start_input_thread() -> InputSystem:
+    """Read keys from stdin on a background thread.
+
+    The thread reads the raw fd, never curses, so every curses call stays on
+    the main thread; :func:`sync_terminal_size` takes over the resize
+    handling ``getch`` used to do.
+    """
+    # don't let refresh() poll stdin for typeahead the reader thread owns
+    curses.typeahead(-1)
+    reader = TerminalReader(sys.stdin.fileno(), INPUT_POLL_MS / 1000.0)
+    inputs = InputSystem(reader.getch, hold=KEY_HOLD_TIME, decay=KEY_REPEAT_DECAY)
+    inputs.start()
+    return inputs
+
+
+def sync_terminal_size():
+    """Resize curses to the terminal if it changed since the last frame."""
+    try:
+        size = os.get_terminal_size(sys.__stdout__.fileno())
+    except OSError:
+        return
+    if curses.is_term_resized(size.lines, size.columns):
+        curses.resizeterm(size.lines, size.columns)
+
+
 def format_time(t: float) -> str:
     m = int(t // 60)
     s = t % 60
@@ -125,7 +215,159 @@ def countdown(stdscr, draw_cb=None):
         draw_cb()
 
 
-def draw_scene(stdscr, game_map: Map, player: Player, flash=None, background=None, ai_players=None):
+def cast_ray(game_map, x, y, dir_x, dir_y, far, solid):
+    """Walk the tile grid from world ``(x, y)`` along ``(dir_x, dir_y)``.
+
+    Uses a DDA over tiles so each step lands on the next tile boundary.
+    Returns ``(distance, side, tile_x, tile_y)`` for the first solid tile
+    entered within ``far`` (distance in units of the direction vector;
+    ``side`` is 0 for an x face, 1 for a y face), or ``None`` when nothing
+    is hit.
+    """
+    px = x / MAP_SCALE
+    py = y / MAP_SCALE
+    dx = dir_x / MAP_SCALE
+    dy = dir_y / MAP_SCALE
+    ix = math.floor(px)
+    iy = math.floor(py)
+    if dx > 0:
+        step_x, t_max_x, t_delta_x = 1, (ix + 1 - px) / dx, 1 / dx
+    elif dx < 0:
+        step_x, t_max_x, t_delta_x = -1, (px - ix) / -dx, -1 / dx
+    else:
+        step_x, t_max_x, t_delta_x = 0, math.inf, math.inf
+    if dy > 0:
+        step_y, t_max_y, t_delta_y = 1, (iy + 1 - py) / dy, 1 / dy
+    elif dy < 0:
+        step_y, t_max_y, t_delta_y = -1, (py - iy) / -dy, -1 / dy
+    else:
+        step_y, t_max_y, t_delta_y = 0, math.inf, math.inf
+    char_at = game_map.char_at
+    while True:
+        if t_max_x < t_max_y:
+            t = t_max_x
+            t_max_x += t_delta_x
+            ix += step_x
+            side = 0
+        else:
+            t = t_max_y
+            t_max_y += t_delta_y
+            iy += step_y
+            side = 1
+        if t > far:
+            return None
+        if char_at(ix, iy) in solid:
+            return t, side, ix, iy
+
+
+def draw_walls(stdscr, game_map, cam_x, cam_y, forward_x, forward_y, right_x, right_y,
+               height, width, horizon, tables, flash):
+    """Draw one extruded wall strip per column; return the rows each strip covers.
+
+    Returns ``(tops, bottoms)`` with one entry per column. Columns with no
+    wall in view get ``-1`` for both so the floor is drawn in full; rows
+    above a strip still show the floor beyond the wall.
+    """
+    rows = height - horizon
+    flashing = flash['timer'] > 0
+    flash_tile = None
+    if flashing and flash['x'] is not None:
+        flash_tile = (int(flash['x'] / MAP_SCALE), int(flash['y'] / MAP_SCALE))
+    tops = []
+    bottoms = []
+    for sx in range(width - 1):
+        k = ((sx - width / 2) / (width / 2)) * FOV * CHAR_RATIO
+        hit = cast_ray(game_map, cam_x, cam_y,
+                       forward_x + right_x * k, forward_y + right_y * k,
+                       VIEW_DISTANCE, tables.solid)
+        if hit is None:
+            tops.append(-1)
+            bottoms.append(-1)
+            continue
+        dist, side, tx, ty = hit
+        # same depth -> row mapping as the floor sampler
+        base = height - dist * rows / VIEW_DISTANCE
+        top = max(0, int(base - WALL_HEIGHT * rows / max(dist, 1.0)))
+        # walls nearer than the bottom floor row are clipped to it, not skipped
+        bottom = min(height - 2, int(base))
+        tops.append(top)
+        bottoms.append(bottom)
+        cls = tables.classes.get(game_map.char_at(tx, ty), 0)
+        shade = min(SHADES - 1, int(dist / VIEW_DISTANCE * SHADES))
+        alt = 1 if (tx, ty) == flash_tile else 0
+        idx = cell_index(cls, shade, side, alt)
+        glyph = tables.wall_glyphs[idx]
+        attr = tables.wall_attrs[idx]
+        for sy in range(top, bottom + 1):
+            stdscr.addch(sy, sx, glyph, attr)
+    return tops, bottoms
+
+
+class FloorCache:
+    """Floor samples from the previous frame, reused while the camera coasts.
+
+    Each floor cell keeps the tile it sampled and its table index without
+    the pixel-dependent flash/checker bit. Next frame a cell whose world
+    position still falls on the same tile reuses that index instead of
+    looking the tile up again; cells that crossed a tile edge are sampled
+    from scratch. A large camera move or turn, a resize, a map reload or a
+    theme switch re-samples the whole floor.
+    """
+
+    def __init__(self, max_move: float = None, max_turn: float = None):
+        self.max_move = FLOOR_CACHE_MAX_MOVE if max_move is None else max_move
+        self.max_turn = FLOOR_CACHE_MAX_TURN if max_turn is None else max_turn
+        self.tile_x = []
+        self.tile_y = []
+        self.cells = []
+        self.frames = 0
+        self.full_frames = 0
+        self.hits = 0
+        self.misses = 0
+        # counts for the most recent frame only
+        self.frame_hits = 0
+        self.frame_misses = 0
+        self._key = None
+        self._camera = None
+
+    def prepare(self, width, height, horizon, game_map, tables, cam_x, cam_y, angle) -> bool:
+        """Start a frame; return whether the previous frame's samples may be reused."""
+        key = (width, height, horizon, game_map, game_map.version, tables)
+        reuse = key == self._key
+        if reuse:
+            last_x, last_y, last_angle = self._camera
+            turn = abs((angle - last_angle + math.pi) % (2 * math.pi) - math.pi)
+            reuse = (math.hypot(cam_x - last_x, cam_y - last_y) <= self.max_move
+                     and turn <= self.max_turn)
+        else:
+            count = max(0, height - 1 - horizon) * max(0, width - 1)
+            self.tile_x = [0] * count
+            self.tile_y = [0] * count
+            self.cells = [0] * count
+            self._key = key
+        self._camera = (cam_x, cam_y, angle)
+        self.frames += 1
+        if not reuse:
+            self.full_frames += 1
+        return reuse
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {
+            'frames': self.frames,
+            'full_frames': self.full_frames,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate,
+        }
+
+
+def draw_scene(stdscr, game_map: Map, player: Player, flash=None, background=None, ai_players=None,
+               theme=None, renderer=None, floor_cache=None):
     height, width = stdscr.getmaxyx()
     horizon = int(height * HORIZON_RATIO)
     if flash is None:
@@ -134,6 +376,10 @@ def draw_scene(stdscr, game_map: Map, player: Player, flash=None, background=Non
         background = BACKGROUND
     if ai_players is None:
         ai_players = []
+    if theme is None:
+        theme = THEME
+    if renderer is None:
+        renderer = WALL_RENDERER
 
     forward_x = math.sin(player.angle)
     forward_y = -math.cos(player.angle)
@@ -145,78 +391,94 @@ def draw_scene(stdscr, game_map: Map, player: Player, flash=None, background=Non
     cam_x = player.x - forward_x * CAMERA_OFFSET
     cam_y = player.y - forward_y * CAMERA_OFFSET
 
+    tables = theme.compiled()
     bg_h = len(background)
     bg_w = max(len(l) for l in background) if bg_h else 0
-    for sy in range(horizon):
-        if bg_h == 0:
-            break
-        rel_y = sy / max(1, horizon - 1)
-        by = int(rel_y * bg_h)
-        for sx in range(width):
-            ang = (sx / width - 0.5) * FOV
-            world_ang = (player.angle + ang) % (2 * math.pi)
-            bx = int((world_ang / (2 * math.pi)) * bg_w)
-            ch = ' '
-            if 0 <= by < bg_h and 0 <= bx < len(background[by]):
-                ch = background[by][bx]
-            color_id = BG_COLOR_MAP.get(ch, 12)
-            if ch == '.':
-                color_id = 17 if player.frame % 2 == 0 else 18
-            stdscr.addch(sy, sx, ord(ch), curses.color_pair(color_id))
-
+    if bg_h:
+        # the background column only depends on the screen column
+        columns = [
+            int((((player.angle + (sx / width - 0.5) * FOV) % (2 * math.pi)) / (2 * math.pi)) * bg_w)
+            for sx in range(width)
+        ]
+        blink = player.frame % 2
+        sky_attrs = tables.sky_attrs[blink]
+        for sy in range(horizon):
+            rel_y = sy / max(1, horizon - 1)
+            by = int(rel_y * bg_h)
+            row = background[by] if 0 <= by < bg_h else ''
+            row_len = len(row)
+            for sx in range(width):
+                bx = columns[sx]
+                code = ord(row[bx]) if 0 <= bx < row_len else 32
+                attr = sky_attrs[code] if code < SKY_TABLE_SIZE else tables.sky_default
+                stdscr.addch(sy, sx, code, attr)
+
+    wall_tops = None
+    if renderer == 'raycast':
+        wall_tops, wall_bottoms = draw_walls(stdscr, game_map, cam_x, cam_y, forward_x, forward_y,
+                                             right_x, right_y, height, width, horizon, tables,
+                                             flash)
+
+    classes = tables.classes
+    kinds = tables.kinds
+    glyphs = tables.glyphs
+    attrs = tables.attrs
+    char_at = game_map.char_at
+    neighbor_mask = game_map.neighbor_mask
+    flashing = flash['timer'] > 0
+    reuse = False
+    if floor_cache is not None:
+        reuse = floor_cache.prepare(width, height, horizon, game_map, tables,
+                                    cam_x, cam_y, player.angle)
+        cache_x = floor_cache.tile_x
+        cache_y = floor_cache.tile_y
+        cache_cells = floor_cache.cells
+    hits = 0
+    misses = 0
     for sy in range(horizon, height - 1):
         depth = ((height - sy) / (height - horizon)) * VIEW_DISTANCE
+        row = (sy - horizon) * (width - 1)
         for sx in range(width - 1):
+            if wall_tops and wall_tops[sx] <= sy <= wall_bottoms[sx]:
+                continue  # covered by this column's wall strip
             offset = ((sx - width / 2) / (width / 2)) * depth * FOV * CHAR_RATIO
             wx = cam_x + forward_x * depth + right_x * offset
             wy = cam_y + forward_y * depth + right_y * offset
             tx = int(wx / MAP_SCALE)
             ty = int(wy / MAP_SCALE)
-            ch = game_map.char_at(tx, ty)
-            draw = ' '
-            color = curses.color_pair(3)
-            neighbors = [
-                game_map.char_at(tx + dx, ty + dy)
-                for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1))
-            ]
-            if ch == 'o':
-                if flash['timer'] > 0 and flash['x'] == int(wx) and flash['y'] == int(wy):
-                    color = curses.color_pair(10)
-                else:
-                    color = curses.color_pair(1)
-                neighbors = [
-                    game_map.char_at(tx + dx, ty + dy)
-                    for dx, dy in ((-1, 0), (1, 0), (0, -1), (0, 1))
-                ]
-                angle_to_cell = math.atan2(wy - cam_y, wx - cam_x)
-                rel_ang = abs((angle_to_cell - player.angle + math.pi) % (2 * math.pi) - math.pi)
-                shade_idx = min(3, int(rel_ang / (math.pi / 6)))
-                if any(n != 'o' for n in neighbors):
-                    shade_idx = min(shade_idx + 1, 3)
-                shades = ['█', '▓', '▒', '░']
-                draw = shades[shade_idx]
-            elif ch == '~':
-                color = curses.color_pair(4)
-                draw = '░'
-            elif ch == 'J':
-                color = curses.color_pair(5)
-                draw = '▓'
-            elif ch == '#':
-                color = curses.color_pair(6)
-                draw = '▒'
-            elif ch == '=':
-                draw = '▓'
-                if (int(wx) + int(wy)) % 2 == 0:
-                    color = curses.color_pair(7)
-                else:
-                    color = curses.color_pair(10)
-            # Apply simple blending at boundaries between different tiles
-            if any(n != ch for n in neighbors):
-                if draw == ' ':
-                    draw = '░'
-                elif draw in {'▓', '▒'}:
-                    draw = '▒'
-            stdscr.addch(sy, sx, ord(draw), color)
+            if reuse and cache_x[row + sx] == tx and cache_y[row + sx] == ty:
+                # same tile as last frame; the shade only depends on the
+                # cell's screen position, so the whole index carries over
+                idx = cache_cells[row + sx]
+                kind = kinds[idx // CLASS_STRIDE]
+                hits += 1
+            else:
+                cls = classes.get(char_at(tx, ty), 0)
+                kind = kinds[cls]
+                edge = 1 if neighbor_mask(tx, ty) else 0
+                shade = 0
+                if kind & KIND_SHADED:
+                    angle_to_cell = math.atan2(wy - cam_y, wx - cam_x)
+                    rel_ang = abs((angle_to_cell - player.angle + math.pi) % (2 * math.pi) - math.pi)
+                    shade = min(SHADES - 1, int(rel_ang / (math.pi / 6)))
+                idx = cell_index(cls, shade, edge, 0)
+                if floor_cache is not None:
+                    cache_x[row + sx] = tx
+                    cache_y[row + sx] = ty
+                    cache_cells[row + sx] = idx
+                    misses += 1
+            # flash and checker pick the pair per world cell, never cached
+            if kind & KIND_FLASH:
+                if flashing and flash['x'] == int(wx) and flash['y'] == int(wy):
+                    idx += 1
+            elif kind & KIND_CHECKER:
+                idx += (int(wx) + int(wy)) % 2
+            stdscr.addch(sy, sx, glyphs[idx], attrs[idx])
+    if floor_cache is not None:
+        floor_cache.frame_hits = hits
+        floor_cache.frame_misses = misses
+        floor_cache.hits += hits
+        floor_cache.misses += misses
 
     def project(x, y):
         """Project world coordinates to screen coordinates and scale."""
@@ -291,21 +553,11 @@ def draw_scene(stdscr, game_map: Map, player: Player, flash=None, background=Non
             map_x = map_start_x + mx
             map_y = map_start_y + my
             char = game_map.char_at(map_x, map_y)
-            color = curses.color_pair(3)  # road by default
-            if char == 'o':
-                color = curses.color_pair(1)
-            elif char == '~':
-                color = curses.color_pair(4)
-            elif char == 'J':
-                color = curses.color_pair(5)
-            elif char == '#':
-                color = curses.color_pair(6)
-            elif char == '=':
-                color = curses.color_pair(7)
+            color = tables.minimap_attrs[classes.get(char, 0)]
             draw_char = char
             if px == map_x and py == map_y:
                 draw_char = player.direction_arrow()
-                color = curses.color_pair(2)
+                color = tables.player_attr
             stdscr.addch(start_y + my, start_x + mx, ord(draw_char), color)
 
     # minimap border
@@ -366,35 +618,45 @@ def explosion_animation(stdscr, width, height):
         time.sleep(0.15)
 
 
-def main(stdscr):
+def advance_player(player, game_map, flash_wall, start_line_y, telemetry=None, racer=0) -> bool:
+    """Move ``player`` one tick and apply lap, jump and wall effects.
+
+    Returns ``False`` once the player's health has run out.
+    """
+    prev_x, prev_y = player.x, player.y
+    player.update()
+    tile = game_map.char_at(player.x / MAP_SCALE, player.y / MAP_SCALE)
+    if prev_y < start_line_y <= player.y:
+        lap_time = player.complete_lap()
+        if telemetry:
+            telemetry.record_lap(racer, lap_time)
+    if tile == 'J':
+        player.jump()
+    if tile == 'o':
+        if telemetry:
+            telemetry.record_wall_hit(racer)
+        flash_wall['x'] = int(player.x)
+        flash_wall['y'] = int(player.y)
+        flash_wall['timer'] = 3
+        player.x = prev_x - math.sin(player.angle) * 0.5
+        player.y = prev_y + math.cos(player.angle) * 0.5
+        player.speed = -0.2
+        player.health -= 1
+    if telemetry:
+        telemetry.record_health(racer, player.health)
+    return player.health > 0
+
+
+def main(stdscr, metrics_port=None, metrics_file=None, hot_reload=False, ai_workers=0):
     curses.curs_set(0)
     stdscr.nodelay(False)
     stdscr.keypad(True)
-    curses.start_color()
-    curses.init_pair(1, curses.COLOR_YELLOW, curses.COLOR_BLACK)   # wall
-    curses.init_pair(2, curses.COLOR_WHITE, curses.COLOR_BLACK)    # ship body
-    curses.init_pair(3, curses.COLOR_WHITE, curses.COLOR_BLACK)    # road
-    curses.init_pair(4, curses.COLOR_BLUE, curses.COLOR_BLACK)     # water
-    curses.init_pair(5, curses.COLOR_CYAN, curses.COLOR_BLACK)     # jump pad
-    curses.init_pair(6, curses.COLOR_MAGENTA, curses.COLOR_BLACK)  # dirt
-    curses.init_pair(7, curses.COLOR_WHITE, curses.COLOR_BLACK)    # start line checker
-    curses.init_pair(8, curses.COLOR_RED, curses.COLOR_BLACK)      # flame
-    curses.init_pair(9, curses.COLOR_BLUE, curses.COLOR_BLACK)     # boost flame
-    curses.init_pair(10, curses.COLOR_BLACK, curses.COLOR_BLACK)   # empty / flash
-    curses.init_pair(11, curses.COLOR_YELLOW, curses.COLOR_RED)    # explosion
-    curses.init_pair(12, curses.COLOR_BLUE, curses.COLOR_BLACK)    # background blue
-    curses.init_pair(13, curses.COLOR_WHITE, curses.COLOR_BLACK)   # grey
-    curses.init_pair(14, curses.COLOR_YELLOW, curses.COLOR_BLACK)  # yellow
-    curses.init_pair(15, curses.COLOR_GREEN, curses.COLOR_BLACK)   # green
-    curses.init_pair(16, curses.COLOR_GREEN, curses.COLOR_BLACK)   # dark green
-    curses.init_pair(17, curses.COLOR_RED, curses.COLOR_BLACK)     # blink bright
-
-    curses.init_pair(18, curses.COLOR_RED, curses.COLOR_BLACK)     # blink dark
+    set_theme(THEME)
 
     if not show_title_screen(stdscr):
         return
 
-    game_map = Map.from_file('sample_map.txt')
+    game_map = Map.from_file(MAP_PATH)
     player = Player(x=game_map.start_x * MAP_SCALE, y=game_map.start_y * MAP_SCALE)
     ai_players = [
         AIPlayer(
@@ -403,7 +665,11 @@ def main(stdscr):
         )
         for i in range(31)
     ]
-    orchestrator = AIOrchestrator(player, ai_players)
+    telemetry = Telemetry(len(ai_players) + 1)
+    if ai_workers:
+        orchestrator = ShardedAIOrchestrator(player, ai_players, game_map, ai_workers, telemetry)
+    else:
+        orchestrator = AIOrchestrator(player, ai_players, telemetry)
     flash_wall = {'x': None, 'y': None, 'timer': 0}
 
     def draw_start_scene():
@@ -413,35 +679,44 @@ def main(stdscr):
 
     draw_start_scene()
     countdown(stdscr, draw_cb=draw_start_scene)
-    stdscr.nodelay(True)
-
+    inputs = None
+    if not keylib:
+        inputs = start_input_thread()
+    metrics = None
+    if metrics_port is not None:
+        metrics = MetricsServer(telemetry, metrics_port)
+        metrics.start()
+    exporter = JsonlExporter(metrics_file) if metrics_file else None
+    watcher = MapWatcher(MAP_PATH, game_map) if hot_reload else None
+    floor_cache = FloorCache() if FLOOR_CACHE else None
+    try:
+        run_race(stdscr, game_map, player, ai_players, orchestrator, flash_wall, inputs,
+                 telemetry, exporter, watcher, floor_cache)
+    finally:
+        if inputs:
+            inputs.stop()
+        if metrics:
+            metrics.stop()
+        if exporter:
+            exporter.write(telemetry)
+        if ai_workers:
+            orchestrator.close()
+
+
+def run_race(stdscr, game_map, player, ai_players, orchestrator, flash_wall, inputs,
+             telemetry, exporter=None, watcher=None, floor_cache=None):
     start_line_y = game_map.start_y * MAP_SCALE
 
     last_time = time.time()
-    key_timers = {}
-
-    KEY_HOLD_FRAMES = 15
-
-    def press(k):
-        """Record that key ``k`` is pressed for a few frames."""
-        for existing in list(key_timers.keys()):
-            key_timers[existing] = KEY_HOLD_FRAMES
-        key_timers[k] = KEY_HOLD_FRAMES
 
     while True:
+        if watcher and watcher.poll(time.time()):
+            start_line_y = game_map.start_y * MAP_SCALE
+
+        snap = None
         if keylib:
             if keylib.is_pressed('q'):
                 return
-        else:
-            while True:
-                key = stdscr.getch()
-                if key == -1:
-                    break
-                if key in (ord('q'), ord('Q')):
-                    return
-                press(key)
-
-        if keylib:
             if keylib.is_pressed('left'):
                 player.turn_left()
             if keylib.is_pressed('right'):
@@ -451,65 +726,119 @@ def main(stdscr):
             if keylib.is_pressed('down'):
                 player.vertical_input(-1)
             player.throttle = keylib.is_pressed('space')
-            if keylib.is_pressed('b'):
-                player.start_boost()
+            if keylib.is_pressed('b') and player.start_boost():
+                telemetry.record_boost(0)
         else:
-            if key_timers.get(curses.KEY_LEFT, 0) > 0:
+            snap = inputs.snapshot()
+            if snap.was_pressed(ord('q'), ord('Q')):
+                return
+            if snap.was_pressed(ord('t'), ord('T')):
+                next_theme()
+            if snap.is_held(curses.KEY_LEFT):
                 player.turn_left()
-            if key_timers.get(curses.KEY_RIGHT, 0) > 0:
+            if snap.is_held(curses.KEY_RIGHT):
                 player.turn_right()
-            if key_timers.get(curses.KEY_UP, 0) > 0:
+            if snap.is_held(curses.KEY_UP):
                 player.vertical_input(1)
-            if key_timers.get(curses.KEY_DOWN, 0) > 0:
+            if snap.is_held(curses.KEY_DOWN):
                 player.vertical_input(-1)
 
-            player.throttle = key_timers.get(ord(' '), 0) > 0
+            player.throttle = snap.is_held(ord(' '))
 
-            if key_timers.get(ord('b'), 0) > 0 or key_timers.get(ord('B'), 0) > 0:
-                player.start_boost()
-
-            for k in list(key_timers.keys()):
-                key_timers[k] -= 1
-                if key_timers[k] <= 0:
-                    del key_timers[k]
+            if snap.is_held(ord('b'), ord('B')) and player.start_boost():
+                telemetry.record_boost(0)
 
         if flash_wall['timer'] > 0:
             flash_wall['timer'] -= 1
 
-        prev_x, prev_y = player.x, player.y
-        player.update()
+        alive = advance_player(player, game_map, flash_wall, start_line_y, telemetry)
         orchestrator.update(game_map)
-        tile = game_map.char_at(player.x / MAP_SCALE, player.y / MAP_SCALE)
-        if prev_y < start_line_y <= player.y:
-            player.complete_lap()
-        if tile == 'J':
-            player.jump()
-        if tile == 'o':
-            flash_wall['x'] = int(player.x)
-            flash_wall['y'] = int(player.y)
-            flash_wall['timer'] = 3
-            player.x = prev_x - math.sin(player.angle) * 0.5
-            player.y = prev_y + math.cos(player.angle) * 0.5
-            player.speed = -0.2
-            player.health -= 1
-            if player.health <= 0:
-                height, width = stdscr.getmaxyx()
-                explosion_animation(stdscr, width, height)
-                break
+        if not alive:
+            height, width = stdscr.getmaxyx()
+            explosion_animation(stdscr, width, height)
+            break
 
+        sync_terminal_size()
         stdscr.erase()
-        draw_scene(stdscr, game_map, player, flash_wall, ai_players=ai_players)
+        draw_scene(stdscr, game_map, player, flash_wall, ai_players=ai_players,
+                   floor_cache=floor_cache)
         stdscr.refresh()
+        if floor_cache:
+            telemetry.record_floor_cache(floor_cache.frame_hits, floor_cache.frame_misses)
+        if snap is not None:
+            inputs.presented(snap)
+            if snap.oldest is not None:
+                telemetry.record_input_latency(inputs.latency.last)
 
         elapsed = time.time() - last_time
+        telemetry.record_frame(elapsed)
+        if exporter:
+            exporter.maybe_write(telemetry)
         sleep_time = max(0, FRAME_DELAY - elapsed)
         time.sleep(sleep_time)
         last_time = time.time()
 
 
 if __name__ == "__main__":
+    # net and broadcast "import game"; alias this module so they share its
+    # settings (e.g. WALL_RENDERER) instead of loading a second copy
+    sys.modules.setdefault('game', sys.modules[__name__])
+    parser = argparse.ArgumentParser(description="ASCII Racer")
+    parser.add_argument('--serve', metavar='PORT', type=int,
+                        help="run a headless race server on localhost")
+    parser.add_argument('--host', default='127.0.0.1',
+                        help="address to bind or connect to")
+    parser.add_argument('--connect', metavar='PORT', type=int,
+                        help="join a race server and render your own racer")
+    parser.add_argument('--broadcast', metavar='SOCKET',
+                        help="render a spectator view once and stream it to a Unix socket")
+    parser.add_argument('--camera', choices=('leader', 'cycle'), default='leader',
+                        help="spectator camera for --broadcast")
+    parser.add_argument('--size', metavar='WxH', default='80x24',
+                        help="frame size for --broadcast")
+    parser.add_argument('--watch', metavar='SOCKET',
+                        help="view a running broadcast")
+    parser.add_argument('--metrics-port', metavar='PORT', type=int,
+                        help="serve Prometheus metrics on localhost:PORT/metrics")
+    parser.add_argument('--metrics-file', metavar='PATH',
+                        help="append telemetry summaries to a JSON-lines file")
+    parser.add_argument('--hot-reload', action='store_true',
+                        help="reload the map file while racing when it changes")
+    parser.add_argument('--raycast', action='store_true',
+                        help="draw walls as raycast vertical strips instead of flat tiles")
+    parser.add_argument('--ai-workers', metavar='N', type=int, default=0,
+                        help="compute AI decisions in N worker processes")
+    parser.add_argument('--reproject', action='store_true',
+                        help="reuse last frame's floor samples while the camera moves slowly")
+    args = parser.parse_args()
+    if args.raycast:
+        WALL_RENDERER = 'raycast'
+    if args.reproject:
+        FLOOR_CACHE = True
+
+    if args.serve is not None:
+        import asyncio
+        import net
+        try:
+            asyncio.run(net.serve(args.host, args.serve))
+        except KeyboardInterrupt:
+            pass
+        sys.exit(0)
+
     enter_fullscreen()
     try:
-        curses.wrapper(main)
+        if args.watch:
+            import broadcast
+            broadcast.watch(args.watch)
+        elif args.broadcast:
+            import broadcast
+            cols, rows = (int(v) for v in args.size.lower().split('x'))
+            curses.wrapper(broadcast.run_broadcast, args.broadcast, rows, cols, args.camera)
+        elif args.connect is not None:
+            import net
+            curses.wrapper(net.client_main, args.host, args.connect)
+        else:
+            curses.wrapper(main, args.metrics_port, args.metrics_file, args.hot_reload,
+                          args.ai_workers)
     finally:
         exit_fullscreen()
@@ -1,29 +1,152 @@
+import os
+
+# right, left, down, up
+NEIGHBOR_OFFSETS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+
+
+def _parse(lines):
+    """Strip line endings and pull out the ``S`` start marker."""
+    lines = [line.rstrip('\n') for line in lines]
+    start = None
+    for y, line in enumerate(lines):
+        x = line.find('S')
+        if x != -1:
+            start = (x, y)
+            # remove the start marker so it is treated as driveable
+            lines[y] = line.replace('S', ' ', 1)
+            break
+    return lines, start
+
+
 class Map:
     """Represents a simple ASCII race track loaded from lines of text."""
 
     def __init__(self, lines):
-        self.lines = [line.rstrip('\n') for line in lines]
+        self.lines, start = _parse(lines)
         self.height = len(self.lines)
         self.width = max(len(line) for line in self.lines) if self.lines else 0
 
         self.start_x = 1
         self.start_y = self.height - 2
-        for y, line in enumerate(self.lines):
-            x = line.find('S')
-            if x != -1:
-                self.start_x = x
-                self.start_y = y
-                # remove the start marker so it is treated as driveable
-                self.lines[y] = line.replace('S', ' ', 1)
-                break
+        if start:
+            self.start_x, self.start_y = start
+        # bumped on every reload so caches built from the map can notice
+        self.version = 0
+        self._build_masks()
 
     @classmethod
     def from_file(cls, path):
         with open(path, 'r') as f:
             return cls([line.rstrip('\n') for line in f])
 
+    def _mask_for(self, x, y):
+        ch = self.char_at(x, y)
+        mask = 0
+        for bit, (dx, dy) in enumerate(NEIGHBOR_OFFSETS):
+            if self.char_at(x + dx, y + dy) != ch:
+                mask |= 1 << bit
+        return mask
+
+    def _build_masks(self):
+        # one cell of margin so tiles just outside the map see the border
+        self._mask_w = self.width + 2
+        self.masks = bytearray(self._mask_w * (self.height + 2))
+        for y in range(-1, self.height + 1):
+            row = (y + 1) * self._mask_w + 1
+            for x in range(-1, self.width + 1):
+                self.masks[row + x] = self._mask_for(x, y)
+
+    def _update_masks(self, changed):
+        dirty = set()
+        for x, y in changed:
+            dirty.add((x, y))
+            for dx, dy in NEIGHBOR_OFFSETS:
+                dirty.add((x + dx, y + dy))
+        for x, y in dirty:
+            if -1 <= x <= self.width and -1 <= y <= self.height:
+                self.masks[(y + 1) * self._mask_w + x + 1] = self._mask_for(x, y)
+
+    def neighbor_mask(self, x, y):
+        """Bit mask of the 4-neighbors whose tile differs from the tile at ``(x, y)``."""
+        if -1 <= x <= self.width and -1 <= y <= self.height:
+            return self.masks[(y + 1) * self._mask_w + x + 1]
+        return 0
+
+    def reload(self, lines):
+        """Patch the map to match ``lines`` and return the changed tiles.
+
+        Rows are compared first and only differing rows are scanned, so the
+        neighbor masks are only recomputed around tiles that actually
+        changed. A change of map size rebuilds them.
+        """
+        new_lines, start = _parse(lines)
+        old_lines = self.lines
+        changed = []
+        for y in range(max(len(old_lines), len(new_lines))):
+            old = old_lines[y] if y < len(old_lines) else ''
+            new = new_lines[y] if y < len(new_lines) else ''
+            if old == new:
+                continue
+            for x in range(max(len(old), len(new))):
+                # past the end of a row reads as wall, same as char_at
+                a = old[x] if x < len(old) else 'o'
+                b = new[x] if x < len(new) else 'o'
+                if a != b:
+                    changed.append((x, y))
+
+        old_size = (self.width, self.height)
+        self.lines = new_lines
+        self.height = len(new_lines)
+        self.width = max(len(line) for line in new_lines) if new_lines else 0
+        if start:
+            self.start_x, self.start_y = start
+        if not changed and old_size == (self.width, self.height):
+            return changed
+        if old_size != (self.width, self.height):
+            self._build_masks()
+        else:
+            self._update_masks(changed)
+        self.version += 1
+        return changed
+
     def char_at(self, x, y):
         ix, iy = int(x), int(y)
         if 0 <= iy < self.height and 0 <= ix < len(self.lines[iy]):
             return self.lines[iy][ix]
         return 'o'  # treat out-of-bounds as wall
+
+
+class MapWatcher:
+    """Poll a map file and hot-reload it into a running :class:`Map`."""
+
+    def __init__(self, path, game_map, interval=0.5):
+        self.path = path
+        self.game_map = game_map
+        self.interval = interval
+        self._stamp = self._stat()
+        self._checked = 0.0
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def poll(self, now):
+        """Reload the map if the file changed; return the changed tiles."""
+        if now - self._checked < self.interval:
+            return []
+        self._checked = now
+        stamp = self._stat()
+        if stamp is None or stamp == self._stamp:
+            return []
+        self._stamp = stamp
+        try:
+            with open(self.path, 'r') as f:
+                lines = f.read().split('\n')
+        except OSError:
+            return []
+        if lines and lines[-1] == '':
+            lines.pop()
+        return self.game_map.reload(lines)
@@ -0,0 +1,506 @@
+"""Local authoritative race server and rendering client.
+
+The server owns every racer's simulation and streams snapshots to clients
+over TCP. Each racer is packed into a fixed-layout binary record and
+snapshots are sent as deltas against the last snapshot the client
+acknowledged, so a racer that did not move costs nothing and a moving one
+only pays for the fields that changed. Racers that left since the baseline
+are listed by id so clients drop them.
+"""
+import asyncio
+import collections
+import math
+import struct
+import time
+
+from ai import AIPlayer, AIOrchestrator
+from map_loader import Map
+from player import Player
+
+# (attribute, struct code) in wire order
+FIELDS = (
+    ('x', 'f'),
+    ('y', 'f'),
+    ('angle', 'f'),
+    ('speed', 'f'),
+    ('z', 'f'),
+    ('lean', 'f'),
+    ('health', 'h'),
+    ('lap', 'H'),
+)
+RECORD = struct.Struct('<' + ''.join(code for _, code in FIELDS))
+FIELD_SLICES = []
+_offset = 0
+for _name, _code in FIELDS:
+    _size = struct.calcsize('<' + _code)
+    FIELD_SLICES.append((_offset, _offset + _size))
+    _offset += _size
+
+MSG_WELCOME = 1
+MSG_SNAPSHOT = 2
+MSG_INPUT = 3
+
+FRAME = struct.Struct('<I')  # length prefix for every message
+WELCOME = struct.Struct('<BHH')  # type, racer id, tick rate
+SNAPSHOT = struct.Struct('<BIIHH')  # type, tick, baseline tick, record count, removed count
+DELTA = struct.Struct('<HB')  # racer id, changed field mask
+REMOVED = struct.Struct('<H')  # racer id
+INPUT = struct.Struct('<BIB')  # type, acked tick, buttons
+NO_BASELINE = 0xFFFFFFFF
+
+INPUT_LEFT = 1
+INPUT_RIGHT = 2
+INPUT_UP = 4
+INPUT_DOWN = 8
+INPUT_THROTTLE = 16
+INPUT_BOOST = 32
+
+TICK_RATE = 30
+# How many past snapshots the server keeps as delta baselines.
+SNAPSHOT_HISTORY = 64
+# A client whose unsent output exceeds this many bytes skips snapshots until
+# its socket drains; it then resyncs from whatever baseline is still kept.
+WRITE_HIGH_WATER = 64 * 1024
+# Clients render this many ticks behind the newest snapshot so there is
+# usually a later snapshot to interpolate towards.
+INTERP_DELAY = 2
+
+
+def pack_racer(racer) -> bytes:
+    """Pack the networked state of ``racer`` into a fixed-size record."""
+    return RECORD.pack(
+        racer.x, racer.y, racer.angle, racer.speed, racer.z, racer.lean,
+        max(-32768, min(32767, int(racer.health))), min(65535, int(racer.lap)),
+    )
+
+
+def unpack_racer(record: bytes) -> dict:
+    return dict(zip((name for name, _ in FIELDS), RECORD.unpack(record)))
+
+
+def encode_snapshot(tick: int, states: dict, baseline: dict = None, base_tick: int = None) -> bytes:
+    """Encode ``states`` (racer id -> record) as a delta against ``baseline``.
+
+    Racers whose record matches the baseline are omitted entirely; racers
+    missing from the baseline are sent in full, and racers missing from
+    ``states`` are listed as removed.
+    """
+    if baseline is None:
+        baseline = {}
+        base_tick = NO_BASELINE
+    parts = []
+    count = 0
+    for rid, record in states.items():
+        old = baseline.get(rid)
+        mask = 0
+        changed = []
+        for bit, (start, end) in enumerate(FIELD_SLICES):
+            if old is None or old[start:end] != record[start:end]:
+                mask |= 1 << bit
+                changed.append(record[start:end])
+        if mask:
+            parts.append(DELTA.pack(rid, mask))
+            parts.extend(changed)
+            count += 1
+    removed = [rid for rid in baseline if rid not in states]
+    parts.extend(REMOVED.pack(rid) for rid in removed)
+    return SNAPSHOT.pack(MSG_SNAPSHOT, tick, base_tick, count, len(removed)) + b''.join(parts)
+
+
+def decode_snapshot(data: bytes, baselines: dict):
+    """Decode a snapshot message into ``(tick, base_tick, states)``.
+
+    ``baselines`` maps tick -> states for snapshots already received.
+    Raises ``KeyError`` if the referenced baseline is unknown.
+    """
+    _, tick, base_tick, count, removed = SNAPSHOT.unpack_from(data)
+    if base_tick == NO_BASELINE:
+        states = {}
+    else:
+        states = dict(baselines[base_tick])
+    pos = SNAPSHOT.size
+    for _ in range(count):
+        rid, mask = DELTA.unpack_from(data, pos)
+        pos += DELTA.size
+        record = bytearray(states.get(rid, bytes(RECORD.size)))
+        for bit, (start, end) in enumerate(FIELD_SLICES):
+            if mask & (1 << bit):
+                record[start:end] = data[pos:pos + end - start]
+                pos += end - start
+        states[rid] = bytes(record)
+    for _ in range(removed):
+        (rid,) = REMOVED.unpack_from(data, pos)
+        pos += REMOVED.size
+        states.pop(rid, None)
+    return tick, base_tick, states
+
+
+def lerp_angle(a: float, b: float, t: float) -> float:
+    diff = (b - a + math.pi) % (2 * math.pi) - math.pi
+    return a + diff * t
+
+
+def interpolate(prev: dict, nxt: dict, t: float) -> dict:
+    """Blend two unpacked racer states; integers snap to the newer value."""
+    out = dict(nxt)
+    for name in ('x', 'y', 'speed', 'z', 'lean'):
+        out[name] = prev[name] + (nxt[name] - prev[name]) * t
+    out['angle'] = lerp_angle(prev['angle'], nxt['angle'], t)
+    return out
+
+
+def apply_buttons(player, buttons: int):
+    """Apply a client's button mask the same way the local loop applies keys."""
+    if buttons & INPUT_LEFT:
+        player.turn_left()
+    if buttons & INPUT_RIGHT:
+        player.turn_right()
+    if buttons & INPUT_UP:
+        player.vertical_input(1)
+    if buttons & INPUT_DOWN:
+        player.vertical_input(-1)
+    player.throttle = bool(buttons & INPUT_THROTTLE)
+    if buttons & INPUT_BOOST:
+        player.start_boost()
+
+
+async def read_message(reader) -> bytes:
+    header = await reader.readexactly(FRAME.size)
+    (length,) = FRAME.unpack(header)
+    return await reader.readexactly(length)
+
+
+def frame_message(payload: bytes) -> bytes:
+    return FRAME.pack(len(payload)) + payload
+
+
+class _Client:
+    def __init__(self, writer, racer_id, player):
+        self.writer = writer
+        self.racer_id = racer_id
+        self.player = player
+        self.flash = {'x': None, 'y': None, 'timer': 0}
+        self.buttons = 0
+        self.acked = None
+        self.bytes_sent = 0
+        self.skipped = 0
+
+
+class RaceServer:
+    """Authoritative simulation of one race, shared by every connected client."""
+
+    def __init__(self, game_map: Map, ai_count: int = 31, tick_rate: int = TICK_RATE,
+                 history: int = SNAPSHOT_HISTORY):
+        import game  # deferred: game imports curses and loads art at import
+
+        self._game = game
+        self.game_map = game_map
+        self.tick_rate = tick_rate
+        self.history = history
+        self.tick = 0
+        scale = game.MAP_SCALE
+        self.start_x = game_map.start_x * scale
+        self.start_y = game_map.start_y * scale
+        self.racers = {
+            i: AIPlayer(x=self.start_x, y=self.start_y + (i + 1))
+            for i in range(ai_count)
+        }
+        self.ai_players = list(self.racers.values())
+        self.orchestrator = AIOrchestrator(None, self.ai_players)
+        self.clients = []
+        self._snapshots = {}
+        self._server = None
+        self._task = None
+        self._handlers = set()
+        self._next_id = ai_count
+        self._free_ids = collections.deque()  # (tick freed, racer id)
+
+    def _allocate_id(self) -> int:
+        # reuse an id only once every baseline a client may still hold was
+        # taken after its racer left, so no delta spans two racers
+        if self._free_ids and self.tick - self._free_ids[0][0] > self.history:
+            return self._free_ids.popleft()[1]
+        rid = self._next_id
+        self._next_id += 1
+        return rid
+
+    @property
+    def port(self):
+        return self._server.sockets[0].getsockname()[1] if self._server else None
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0):
+        self._server = await asyncio.start_server(self._handle, host, port)
+        self._task = asyncio.ensure_future(self._run())
+        return self.port
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        for client in self.clients:
+            client.writer.close()
+        if self._handlers:
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        player = Player(x=self.start_x, y=self.start_y)
+        client = _Client(writer, self._allocate_id(), player)
+        self.racers[client.racer_id] = player
+        self.clients.append(client)
+        map_text = '\n'.join(self.game_map.lines).encode('utf-8')
+        writer.write(frame_message(
+            WELCOME.pack(MSG_WELCOME, client.racer_id, self.tick_rate)
+            + struct.pack('<HH', self.game_map.start_x, self.game_map.start_y)
+            + map_text
+        ))
+        try:
+            while True:
+                data = await read_message(reader)
+                if data[0] == MSG_INPUT:
+                    _, acked, buttons = INPUT.unpack(data)
+                    client.buttons = buttons
+                    if acked != NO_BASELINE:
+                        client.acked = acked
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.clients.remove(client)
+            del self.racers[client.racer_id]
+            self._free_ids.append((self.tick, client.racer_id))
+            self._handlers.discard(task)
+            writer.close()
+
+    def step(self):
+        """Advance the simulation by one tick."""
+        start_line_y = self.start_y
+        for client in self.clients:
+            player = client.player
+            if player.health <= 0:
+                continue
+            apply_buttons(player, client.buttons)
+            if client.flash['timer'] > 0:
+                client.flash['timer'] -= 1
+            self._game.advance_player(player, self.game_map, client.flash, start_line_y)
+        humans = [c.player for c in self.clients if c.player.health > 0]
+        if humans:
+            # balance the AI field against the leading human
+            self.orchestrator.player = max(
+                humans, key=lambda r: self.orchestrator._progress(r, self.game_map))
+            self.orchestrator.update(self.game_map)
+        else:
+            for ai in self.ai_players:
+                ai.update_ai(self.game_map)
+        self.tick += 1
+
+    def snapshot(self) -> dict:
+        states = {rid: pack_racer(r) for rid, r in self.racers.items()}
+        self._snapshots[self.tick] = states
+        self._snapshots.pop(self.tick - self.history, None)
+        return states
+
+    def broadcast(self):
+        states = self.snapshot()
+        encoded = {}
+        for client in self.clients:
+            if client.writer.transport.get_write_buffer_size() > WRITE_HIGH_WATER:
+                # stalled reader: don't queue snapshots it cannot take yet
+                client.skipped += 1
+                continue
+            base = client.acked if client.acked in self._snapshots else None
+            if base not in encoded:
+                baseline = self._snapshots[base] if base is not None else None
+                encoded[base] = frame_message(encode_snapshot(self.tick, states, baseline, base))
+            message = encoded[base]
+            client.writer.write(message)
+            client.bytes_sent += len(message)
+
+    async def _run(self):
+        interval = 1.0 / self.tick_rate
+        next_tick = time.monotonic()
+        while True:
+            self.step()
+            self.broadcast()
+            next_tick += interval
+            await asyncio.sleep(max(0.0, next_tick - time.monotonic()))
+
+
+class RaceClient:
+    """Receive snapshots for one racer and interpolate between them."""
+
+    def __init__(self, history: int = SNAPSHOT_HISTORY, interp_delay: int = INTERP_DELAY):
+        self.history = history
+        self.interp_delay = interp_delay
+        self.racer_id = None
+        self.tick_rate = TICK_RATE
+        self.game_map = None
+        self.latest_tick = None
+        self._baselines = {}
+        self._received = {}  # tick -> arrival time
+        self._reader = None
+        self._writer = None
+        self._task = None
+        self.buttons = 0
+        self.bytes_received = 0
+
+    async def connect(self, host: str, port: int):
+        self._reader, self._writer = await asyncio.open_connection(host, port)
+        data = await read_message(self._reader)
+        _, self.racer_id, self.tick_rate = WELCOME.unpack_from(data)
+        start_x, start_y = struct.unpack_from('<HH', data, WELCOME.size)
+        lines = data[WELCOME.size + 4:].decode('utf-8').split('\n')
+        self.game_map = Map(lines)
+        self.game_map.start_x, self.game_map.start_y = start_x, start_y
+        self._task = asyncio.ensure_future(self._receive())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._writer:
+            self._writer.close()
+
+    def send_input(self, buttons: int):
+        acked = NO_BASELINE if self.latest_tick is None else self.latest_tick
+        self._writer.write(frame_message(INPUT.pack(MSG_INPUT, acked, buttons)))
+
+    async def _receive(self):
+        while True:
+            data = await read_message(self._reader)
+            self.bytes_received += len(data) + FRAME.size
+            if data[0] != MSG_SNAPSHOT:
+                continue
+            try:
+                tick, _, states = decode_snapshot(data, self._baselines)
+            except KeyError:
+                continue  # baseline already dropped; wait for the next snapshot
+            self._baselines[tick] = states
+            self._received[tick] = time.monotonic()
+            self._baselines.pop(tick - self.history, None)
+            self._received.pop(tick - self.history, None)
+            if self.latest_tick is None or tick > self.latest_tick:
+                self.latest_tick = tick
+            # acknowledge right away so the next delta uses this baseline
+            self.send_input(self.buttons)
+
+    def states_at(self, render_tick: float) -> dict:
+        """Return unpacked racer states interpolated at ``render_tick``."""
+        ticks = sorted(self._baselines)
+        if not ticks:
+            return {}
+        if render_tick <= ticks[0]:
+            return {rid: unpack_racer(r) for rid, r in self._baselines[ticks[0]].items()}
+        prev = ticks[0]
+        for tick in ticks:
+            if tick >= render_tick:
+                t = (render_tick - prev) / (tick - prev)
+                before = self._baselines[prev]
+                after = self._baselines[tick]
+                out = {}
+                for rid, record in after.items():
+                    cur = unpack_racer(record)
+                    old = before.get(rid)
+                    out[rid] = interpolate(unpack_racer(old), cur, t) if old else cur
+                return out
+            prev = tick
+        return {rid: unpack_racer(r) for rid, r in self._baselines[ticks[-1]].items()}
+
+    def render_tick(self) -> float:
+        """Tick to render now, ``interp_delay`` ticks behind the newest one."""
+        if self.latest_tick is None:
+            return 0.0
+        arrived = self._received.get(self.latest_tick, time.monotonic())
+        since = (time.monotonic() - arrived) * self.tick_rate
+        return self.latest_tick - self.interp_delay + min(since, float(self.interp_delay))
+
+
+def apply_state(racer, state: dict):
+    for name, value in state.items():
+        setattr(racer, name, value)
+
+
+async def serve(host: str = '127.0.0.1', port: int = 0, map_path: str = 'sample_map.txt',
+                ai_count: int = 31):
+    server = RaceServer(Map.from_file(map_path), ai_count=ai_count)
+    bound = await server.start(host, port)
+    print(f"Race server listening on {host}:{bound}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+
+async def play(stdscr, host: str, port: int):
+    """Curses client: send inputs and render the race from our racer's view."""
+    import curses
+    import game
+
+    client = RaceClient()
+    await client.connect(host, port)
+    inputs = game.start_input_thread()
+    me = Player()
+    others = {}
+    try:
+        while True:
+            snap = inputs.snapshot()
+            if snap.was_pressed(ord('q'), ord('Q')):
+                return
+            buttons = 0
+            if snap.is_held(curses.KEY_LEFT):
+                buttons |= INPUT_LEFT
+            if snap.is_held(curses.KEY_RIGHT):
+                buttons |= INPUT_RIGHT
+            if snap.is_held(curses.KEY_UP):
+                buttons |= INPUT_UP
+            if snap.is_held(curses.KEY_DOWN):
+                buttons |= INPUT_DOWN
+            if snap.is_held(ord(' ')):
+                buttons |= INPUT_THROTTLE
+            if snap.is_held(ord('b'), ord('B')):
+                buttons |= INPUT_BOOST
+            client.buttons = buttons
+            client.send_input(buttons)
+
+            states = client.states_at(client.render_tick())
+            for rid in list(others):
+                if rid not in states:
+                    del others[rid]  # racer left the race
+            for rid, state in states.items():
+                if rid == client.racer_id:
+                    apply_state(me, state)
+                else:
+                    apply_state(others.setdefault(rid, Player()), state)
+            me.frame = (me.frame + 1) % 2
+            game.sync_terminal_size()
+            stdscr.erase()
+            game.draw_scene(stdscr, client.game_map, me, ai_players=list(others.values()))
+            stdscr.refresh()
+            inputs.presented(snap)
+            if client.racer_id in states and me.health <= 0:
+                height, width = stdscr.getmaxyx()
+                game.explosion_animation(stdscr, width, height)
+                return
+            await asyncio.sleep(game.FRAME_DELAY)
+    finally:
+        inputs.stop()
+        await client.close()
+
+
+def client_main(stdscr, host: str, port: int):
+    import curses
+    import game
+
+    curses.curs_set(0)
+    stdscr.keypad(True)
+    game.set_theme(game.THEME)
+    asyncio.run(play(stdscr, host, port))
@@ -82,13 +82,14 @@ class Player:
             self.z_speed = 0
         self._z_input = 0.0
 
-    def start_boost(self):
+    def start_boost(self) -> bool:
+        """Start a boost if possible; return True when one was started."""
         if self._boost_frames > 0:
-            return
+            return False
         cost = 19
         available = self.health - 1
         if available <= 0:
-            return
+            return False
         if available < cost:
             ratio = available / cost
             self._boost_frames = max(1, int(self.BOOST_DURATION * ratio))
@@ -96,6 +97,7 @@ class Player:
         else:
             self._boost_frames = self.BOOST_DURATION
             self.health -= cost
+        return True
 
     def jump(self):
         if self.z == 0:
@@ -113,9 +115,10 @@ class Player:
     def total_time(self) -> float:
         return time.time() - self.start_time
 
-    def complete_lap(self):
+    def complete_lap(self) -> float:
         lap_time = time.time() - self._lap_start
         if self.best_lap is None or lap_time < self.best_lap:
             self.best_lap = lap_time
         self.lap += 1
         self._lap_start = time.time()
+        return lap_time
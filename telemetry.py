@@ -0,0 +1,226 @@
+"""Per-racer race telemetry with Prometheus and JSON-lines exporters.
+
+Samples go into fixed-size ring buffers allocated up front, so recording on
+the game loop only overwrites slots. Aggregates are computed when an
+exporter asks for them.
+"""
+import json
+import threading
+import time
+from array import array
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class RingBuffer:
+    """Fixed-size window of float samples plus lifetime count/sum/min/max."""
+
+    def __init__(self, size: int = 256):
+        self.size = size
+        self._data = array('d', bytes(8 * size))
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.last = None
+
+    def push(self, value: float):
+        self._data[self.count % self.size] = value
+        self.count += 1
+        self.total += value
+        self.last = value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def window(self) -> list:
+        n = min(self.count, self.size)
+        return list(self._data[:n])
+
+    def quantile(self, q: float) -> float:
+        samples = sorted(self.window())
+        if not samples:
+            return 0.0
+        return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+class Telemetry:
+    """Race statistics for ``racers`` racers.
+
+    Ids below ``players`` are human racers (id 0 is the local player) and
+    get health and lap rings; the rest are AI racers and get a ring of
+    BASE_ACCEL changes. AI racers never report health or laps, so no rings
+    are allocated for those series.
+    """
+
+    def __init__(self, racers: int, size: int = 256, players: int = 1):
+        self.racers = racers
+        self.players = players
+        self.started = time.time()
+        self.wall_hits = [0] * racers
+        self.boosts = [0] * racers
+        # racer id -> RingBuffer
+        self.health = {rid: RingBuffer(size) for rid in range(players)}
+        self.lap_times = {rid: RingBuffer(size) for rid in range(players)}
+        self.ai_accel = {rid: RingBuffer(size) for rid in range(players, racers)}
+        self.frame_times = RingBuffer(size)
+        self.input_latency = RingBuffer(size)
+        self.floor_cache_hits = 0
+        self.floor_cache_misses = 0
+
+    def record_wall_hit(self, racer: int):
+        self.wall_hits[racer] += 1
+
+    def record_boost(self, racer: int):
+        self.boosts[racer] += 1
+
+    def record_health(self, racer: int, value: float):
+        self.health[racer].push(value)
+
+    def record_lap(self, racer: int, seconds: float):
+        self.lap_times[racer].push(seconds)
+
+    def record_ai_accel(self, racer: int, value: float):
+        self.ai_accel[racer].push(value)
+
+    def record_frame(self, seconds: float):
+        self.frame_times.push(seconds)
+
+    def record_input_latency(self, seconds: float):
+        self.input_latency.push(seconds)
+
+    def record_floor_cache(self, hits: int, misses: int):
+        self.floor_cache_hits += hits
+        self.floor_cache_misses += misses
+
+    def summary(self) -> dict:
+        """Return the current aggregates as plain data."""
+        racers = []
+        empty = RingBuffer(1)
+        for rid in range(self.racers):
+            laps = self.lap_times.get(rid, empty)
+            health = self.health.get(rid, empty)
+            racers.append({
+                'racer': rid,
+                'wall_hits': self.wall_hits[rid],
+                'boosts': self.boosts[rid],
+                'health': health.last,
+                'health_min': health.min,
+                'laps': laps.count,
+                'last_lap': laps.last,
+                'best_lap': laps.min,
+                'ai_accel': self.ai_accel.get(rid, empty).last,
+            })
+        return {
+            'time': time.time(),
+            'uptime': time.time() - self.started,
+            'frames': self.frame_times.count,
+            'frame_time': {str(q): self.frame_times.quantile(q) for q in QUANTILES},
+            'frame_time_max': self.frame_times.max,
+            'input_latency': {str(q): self.input_latency.quantile(q) for q in QUANTILES},
+            'floor_cache': {'hits': self.floor_cache_hits, 'misses': self.floor_cache_misses},
+            'racers': racers,
+        }
+
+    def prometheus(self) -> str:
+        """Render the aggregates in the Prometheus text exposition format."""
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, value in samples:
+                if value is None:
+                    continue
+                label_str = ','.join(f'{k}="{v}"' for k, v in labels.items())
+                lines.append(f'{name}{{{label_str}}} {value}' if label_str else f'{name} {value}')
+
+        def summary(name, help_text, ring):
+            samples = [({'quantile': str(q)}, ring.quantile(q)) for q in QUANTILES]
+            metric(name, 'summary', help_text, samples)
+            lines.append(f'{name}_sum {ring.total}')
+            lines.append(f'{name}_count {ring.count}')
+
+        ids = range(self.racers)
+        metric('race_racer_wall_hits_total', 'counter', 'Wall collisions per racer.',
+               [({'racer': r}, self.wall_hits[r]) for r in ids])
+        metric('race_racer_boosts_total', 'counter', 'Boosts started per racer.',
+               [({'racer': r}, self.boosts[r]) for r in ids])
+        # health and laps exist for human racers, accel for AI racers
+        metric('race_racer_health', 'gauge', 'Most recent health per racer.',
+               [({'racer': r}, ring.last) for r, ring in sorted(self.health.items())])
+        metric('race_racer_laps_total', 'counter', 'Completed laps per racer.',
+               [({'racer': r}, ring.count) for r, ring in sorted(self.lap_times.items())])
+        metric('race_racer_last_lap_seconds', 'gauge', 'Most recent lap time per racer.',
+               [({'racer': r}, ring.last) for r, ring in sorted(self.lap_times.items())])
+        metric('race_racer_best_lap_seconds', 'gauge', 'Best lap time per racer.',
+               [({'racer': r}, ring.min) for r, ring in sorted(self.lap_times.items())])
+        metric('race_racer_ai_base_accel', 'gauge', 'BASE_ACCEL set by the AI orchestrator.',
+               [({'racer': r}, ring.last) for r, ring in sorted(self.ai_accel.items())])
+        summary('race_frame_seconds', 'Simulation and render time per frame.', self.frame_times)
+        summary('race_input_latency_seconds', 'Key press to frame on screen.', self.input_latency)
+        metric('race_floor_cache_hits_total', 'counter', 'Floor cells reused from the previous frame.',
+               [({}, self.floor_cache_hits)])
+        metric('race_floor_cache_misses_total', 'counter', 'Floor cells sampled from the map.',
+               [({}, self.floor_cache_misses)])
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsServer:
+    """Serve ``/metrics`` for a :class:`Telemetry` on a local HTTP port."""
+
+    def __init__(self, telemetry: Telemetry, port: int = 0, host: str = '127.0.0.1'):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = telemetry.prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, fmt, *args):
+                pass  # curses owns the terminal
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever,
+                                        name='metrics-http', daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self._httpd.server_address[1]
+
+    def start(self):
+        self._thread.start()
+        return self.port
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class JsonlExporter:
+    """Append a telemetry summary to a JSON-lines file every ``interval`` seconds."""
+
+    def __init__(self, path: str, interval: float = 5.0):
+        self.path = path
+        self.interval = interval
+        self._last = None
+
+    def maybe_write(self, telemetry: Telemetry, now: float = None) -> bool:
+        now = time.time() if now is None else now
+        if self._last is not None and now - self._last < self.interval:
+            return False
+        self.write(telemetry)
+        self._last = now
+        return True
+
+    def write(self, telemetry: Telemetry):
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(telemetry.summary()) + '\n')
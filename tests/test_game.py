@@ -9,6 +9,7 @@ from map_loader import Map
 from player import Player
 import game
 import math
+import time
 
 
 class DummyScreen:
@@ -32,6 +33,12 @@ class DummyScreen:
         pass
 
 
+def compile_themes(color_pair=lambda n: 0):
+    """Compile every loaded theme's tables without a curses screen."""
+    for theme in game.THEMES:
+        theme.compile(color_pair=color_pair)
+
+
 class MapTests(unittest.TestCase):
     def test_char_at_bounds(self):
         m = Map(['ab', 'cd'])
@@ -41,6 +48,56 @@ class MapTests(unittest.TestCase):
         self.assertEqual(m.char_at(-1, -1), 'o')
         self.assertEqual(m.char_at(5, 5), 'o')
 
+    def test_neighbor_mask(self):
+        m = Map(['ooo', 'o o', 'ooo'])
+        self.assertEqual(m.neighbor_mask(1, 1), 0b1111)
+        self.assertEqual(m.neighbor_mask(0, 0), 0)
+        self.assertEqual(m.neighbor_mask(1, 0), 0b0100)
+        # cells outside the map see the border
+        self.assertEqual(m.neighbor_mask(-1, 1), 0)
+        self.assertEqual(m.neighbor_mask(50, 50), 0)
+
+    def test_reload_patches_derived_data(self):
+        m = Map(['oooooo', 'o S  o', 'o  J o', 'oooooo'])
+        changed = m.reload(['oooooo', 'o   So', 'o#   o', 'ooooooo'])
+        # the extra 'o' reads the same as out of bounds but widens the map
+        self.assertEqual(sorted(changed), [(1, 2), (3, 2)])
+        self.assertEqual(m.width, 7)
+        self.assertEqual((m.start_x, m.start_y), (4, 1))
+        fresh = Map(['oooooo', 'o   So', 'o#   o', 'ooooooo'])
+        self.assertEqual(m.masks, fresh.masks)
+        self.assertEqual(m.version, 1)
+        self.assertEqual(m.reload(list(fresh.lines)), [])
+        self.assertEqual(m.version, 1)
+
+    def test_reload_single_tile_is_incremental(self):
+        rows = ['o' * 300] + ['o' + ' ' * 298 + 'o'] * 298 + ['o' * 300]
+        m = Map(rows)
+        edited = list(rows)
+        edited[150] = edited[150][:150] + 'J' + edited[150][151:]
+        with patch.object(m, '_build_masks') as rebuild:
+            self.assertEqual(m.reload(edited), [(150, 150)])
+        rebuild.assert_not_called()
+        self.assertEqual(m.neighbor_mask(150, 150), 0b1111)
+        self.assertEqual(m.neighbor_mask(151, 150), 0b0010)
+
+    def test_watcher_reloads_on_change(self):
+        import tempfile
+        from map_loader import MapWatcher
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as f:
+            f.write('oooo\no So\noooo\n')
+            path = f.name
+        try:
+            m = Map.from_file(path)
+            watcher = MapWatcher(path, m, interval=0)
+            self.assertEqual(watcher.poll(1.0), [])
+            with open(path, 'w') as f:
+                f.write('oooo\noJSo\noooo\noooo\n')
+            self.assertEqual(watcher.poll(2.0), [(1, 1)])
+            self.assertEqual(m.height, 4)
+        finally:
+            os.unlink(path)
+
 
 class PlayerTests(unittest.TestCase):
     def test_update_and_turn(self):
@@ -77,8 +134,35 @@ class TrackTests(unittest.TestCase):
             self.assertGreaterEqual(off, -1.0)
             self.assertLessEqual(off, 1.0)
 
+    def test_seeded_random_access_matches_updates(self):
+        from track import Track
+        t = Track(seed=42, block_size=4, max_blocks=2)
+        offsets = [t.update() for _ in range(500)]
+        replay = Track(seed=42, block_size=4, max_blocks=2)
+        # query out of order so blocks are evicted and regenerated
+        for tick in (499, 3, 250, 1, 120, 500):
+            self.assertEqual(replay.offset_at(tick), offsets[tick - 1])
+        self.assertLessEqual(len(replay._blocks), 2)
+        self.assertEqual(Track(seed=42).offset_at(77), Track(seed=42).offset_at(77))
+
+    def test_segments_between(self):
+        from track import Track
+        t = Track(seed=7, block_size=3)
+        segs = t.segments_between(10, 200)
+        self.assertLessEqual(segs[0][0], 10)
+        self.assertGreater(segs[0][0] + segs[0][1].length, 10)
+        for (start, seg), (nxt, _) in zip(segs, segs[1:]):
+            self.assertEqual(start + seg.length, nxt)
+        last_start, last = segs[-1]
+        self.assertLess(last_start, 200)
+        self.assertGreaterEqual(last_start + last.length, 200)
+        self.assertIs(t.segment_at(last_start), last)
+
 
 class DrawSceneTests(unittest.TestCase):
+    def setUp(self):
+        compile_themes()
+
     def test_draw_scene_with_small_screen(self):
         scr = DummyScreen(height=4, width=6)
         m = Map(['oooooo', 'o    o', 'oooooo'])
@@ -91,5 +175,543 @@ class DrawSceneTests(unittest.TestCase):
             self.assertLess(x, scr.width)
 
 
+class InputSystemTests(unittest.TestCase):
+    def test_ring_drops_when_full(self):
+        from controls import EventRing
+        ring = EventRing(capacity=2)
+        self.assertTrue(ring.push(1, 0.0))
+        self.assertTrue(ring.push(2, 0.1))
+        self.assertFalse(ring.push(3, 0.2))
+        self.assertEqual(ring.dropped, 1)
+        out = []
+        ring.drain(out)
+        self.assertEqual(out, [(1, 0.0), (2, 0.1)])
+        self.assertEqual(len(ring), 0)
+
+    def test_snapshot_hold_and_latency(self):
+        from controls import InputSystem
+        now = [0.0]
+        inputs = InputSystem(lambda: -1, hold=0.5, clock=lambda: now[0])
+        inputs.feed(ord(' '), 0.0)
+        now[0] = 0.01
+        snap = inputs.snapshot()
+        self.assertTrue(snap.is_held(ord(' ')))
+        self.assertEqual(snap.pressed, (ord(' '),))
+        inputs.presented(snap, stamp=0.03)
+        self.assertAlmostEqual(inputs.latency.last, 0.03)
+        # pressing another key does not extend the first one
+        now[0] = 0.4
+        inputs.feed(ord('b'), 0.4)
+        now[0] = 0.6
+        snap = inputs.snapshot()
+        self.assertFalse(snap.is_held(ord(' ')))
+        self.assertTrue(snap.is_held(ord('b')))
+        self.assertEqual(snap.pressed, (ord('b'),))
+        now[0] = 1.0
+        snap = inputs.snapshot()
+        self.assertFalse(snap.is_held(ord(' '), ord('b')))
+        self.assertEqual(snap.pressed, ())
+
+    def test_auto_repeat_releases_quickly(self):
+        from controls import KeyState
+        keys = KeyState(hold=0.5, decay=3.0, min_release=0.05)
+        left, space = 1, 2
+        keys.press(left, 0.0)
+        # the first press bridges the terminal's repeat delay
+        keys.expire(0.4)
+        self.assertEqual(keys.held(), {left})
+        self.assertIsNone(keys.repeat_interval(left))
+        for i in range(10):
+            keys.press(space, 0.3 + i * 0.03)
+        self.assertAlmostEqual(keys.repeat_interval(space), 0.03)
+        # space's auto-repeat never keeps left held past its own deadline
+        keys.expire(0.51)
+        self.assertEqual(keys.held(), {space})
+        # released three repeat intervals after the last repeat, not after hold
+        keys.expire(0.57 + 0.08)
+        self.assertEqual(keys.held(), {space})
+        keys.expire(0.57 + 0.1)
+        self.assertEqual(keys.held(), frozenset())
+        # after a release the next press is a lone press again
+        keys.press(space, 2.0)
+        self.assertIsNone(keys.repeat_interval(space))
+        keys.expire(2.4)
+        self.assertEqual(keys.held(), {space})
+
+    def test_terminal_reader_decodes_arrows(self):
+        import curses
+        from controls import TerminalReader
+        rfd, wfd = os.pipe()
+        self.addCleanup(os.close, rfd)
+        self.addCleanup(os.close, wfd)
+        reader = TerminalReader(rfd, timeout=0.01)
+        self.assertEqual(reader.getch(), -1)
+        os.write(wfd, b'a\x1b[D\x1bOA')
+        self.assertEqual([reader.getch() for _ in range(3)],
+                         [ord('a'), curses.KEY_LEFT, curses.KEY_UP])
+        # a sequence split across reads waits for the rest
+        os.write(wfd, b'\x1b')
+        self.assertEqual(reader.getch(), -1)
+        os.write(wfd, b'[C')
+        self.assertEqual(reader.getch(), curses.KEY_RIGHT)
+        # an escape byte with nothing after it is the Esc key
+        os.write(wfd, b'\x1b')
+        self.assertEqual(reader.getch(), -1)
+        self.assertEqual(reader.getch(), 27)
+
+    def test_reader_thread(self):
+        from controls import InputSystem
+        keys = [ord('a'), ord('b')]
+
+        def getch():
+            if keys:
+                return keys.pop(0)
+            time.sleep(0.001)
+            return -1
+
+        inputs = InputSystem(getch)
+        inputs.start()
+        try:
+            deadline = time.time() + 1.0
+            while len(inputs.ring) < 2 and time.time() < deadline:
+                time.sleep(0.001)
+        finally:
+            inputs.stop()
+        snap = inputs.snapshot()
+        self.assertEqual(snap.pressed, (ord('a'), ord('b')))
+
+
+class NetTests(unittest.TestCase):
+    def test_snapshot_delta_roundtrip(self):
+        import net
+        racers = [Player(x=i, y=2 * i) for i in range(3)]
+        base = {i: net.pack_racer(r) for i, r in enumerate(racers)}
+        full = net.encode_snapshot(1, base)
+        _, _, decoded = net.decode_snapshot(full, {})
+        self.assertEqual(decoded, base)
+
+        racers[1].x += 1.5
+        cur = {i: net.pack_racer(r) for i, r in enumerate(racers)}
+        delta = net.encode_snapshot(2, cur, base, 1)
+        # one racer, one changed float
+        self.assertEqual(len(delta), net.SNAPSHOT.size + net.DELTA.size + 4)
+        tick, base_tick, decoded = net.decode_snapshot(delta, {1: base})
+        self.assertEqual((tick, base_tick), (2, 1))
+        self.assertEqual(decoded, cur)
+        self.assertAlmostEqual(net.unpack_racer(decoded[1])['x'], 2.5)
+
+        # a racer missing from the new states is removed on the client
+        del cur[2]
+        gone = net.encode_snapshot(3, cur, base, 1)
+        _, _, decoded = net.decode_snapshot(gone, {1: base})
+        self.assertEqual(sorted(decoded), [0, 1])
+
+    def test_interpolate_wraps_angle(self):
+        import net
+        a = {'x': 0.0, 'y': 0.0, 'speed': 0.0, 'z': 0.0, 'lean': 0.0,
+             'angle': 0.1, 'health': 100, 'lap': 1}
+        b = dict(a, x=2.0, angle=2 * math.pi - 0.1, lap=2)
+        mid = net.interpolate(a, b, 0.5)
+        self.assertAlmostEqual(mid['x'], 1.0)
+        self.assertAlmostEqual(mid['angle'], 0.0)
+        self.assertEqual(mid['lap'], 2)
+
+    def test_loopback_race(self):
+        import asyncio
+        import net
+
+        async def scenario():
+            server = net.RaceServer(Map(['oooooo', 'o    o', 'o S  o', 'oooooo']), ai_count=32)
+            port = await server.start()
+            client = net.RaceClient()
+            try:
+                await client.connect('127.0.0.1', port)
+                client.buttons = net.INPUT_THROTTLE
+                client.send_input(client.buttons)
+                deadline = time.monotonic() + 5.0
+                while (client.latest_tick is None or client.latest_tick < 10) \
+                        and time.monotonic() < deadline:
+                    await asyncio.sleep(0.01)
+                states = client.states_at(client.render_tick())
+                self.assertIn(client.racer_id, states)
+                self.assertEqual(len(states), 33)
+                # after the first full snapshot only deltas should be sent
+                per_tick = client.bytes_received / (client.latest_tick + 1)
+                self.assertLess(per_tick, 33 * net.RECORD.size)
+            finally:
+                await client.close()
+                await server.close()
+
+        asyncio.run(scenario())
+
+    def test_disconnect_removes_racer(self):
+        import asyncio
+        import net
+
+        async def wait_for(cond):
+            deadline = time.monotonic() + 5.0
+            while not cond() and time.monotonic() < deadline:
+                await asyncio.sleep(0.01)
+
+        async def scenario():
+            server = net.RaceServer(Map(['oooooo', 'o    o', 'o S  o', 'oooooo']), ai_count=2,
+                                    history=4)
+            port = await server.start()
+            stayer, leaver = net.RaceClient(), net.RaceClient()
+            try:
+                await stayer.connect('127.0.0.1', port)
+                await leaver.connect('127.0.0.1', port)
+                gone = leaver.racer_id
+                await wait_for(lambda: gone in stayer._baselines.get(stayer.latest_tick, {}))
+                self.assertIn(gone, stayer._baselines[stayer.latest_tick])
+                await leaver.close()
+                await wait_for(lambda: gone not in server.racers)
+                tick = server.tick
+                await wait_for(lambda: stayer.latest_tick is not None and stayer.latest_tick > tick)
+                self.assertNotIn(gone, stayer._baselines[stayer.latest_tick])
+                # the id is reused only after every baseline predates the leave
+                await wait_for(lambda: server.tick > tick + server.history)
+                self.assertEqual(server._allocate_id(), gone)
+            finally:
+                await stayer.close()
+                await server.close()
+
+        asyncio.run(scenario())
+
+    def test_stalled_client_is_not_buffered_without_bound(self):
+        import asyncio
+        import socket
+        import net
+
+        async def scenario():
+            server = net.RaceServer(Map(['oooooo', 'o    o', 'o S  o', 'oooooo']), ai_count=500)
+            port = await server.start()
+            sock = socket.socket()
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+            sock.connect(('127.0.0.1', port))  # never reads
+            try:
+                deadline = time.monotonic() + 5.0
+                while not server.clients and time.monotonic() < deadline:
+                    await asyncio.sleep(0.01)
+                client = server.clients[0]
+                for _ in range(300):
+                    for racer in server.racers.values():
+                        racer.x += 0.5
+                    server.broadcast()
+                buffered = client.writer.transport.get_write_buffer_size()
+                full = len(net.frame_message(net.encode_snapshot(0, server.snapshot())))
+                self.assertGreater(client.skipped, 0)
+                self.assertLessEqual(buffered, net.WRITE_HIGH_WATER + full)
+            finally:
+                sock.close()
+                await server.close()
+
+        asyncio.run(scenario())
+
+
+class BroadcastTests(unittest.TestCase):
+    def _encoder(self):
+        import broadcast
+        return broadcast.FrameEncoder(game.COLOR_PAIRS, pair_of=lambda attr: attr)
+
+    def test_diff_only_sends_changed_cells(self):
+        import broadcast
+        fb = broadcast.FrameBuffer(3, 5)
+        fb.addstr(0, 0, 'hello', 3)
+        first = fb.frame()
+        fb.addch(1, 2, ord('X'), 4)
+        second = fb.frame()
+        enc = self._encoder()
+        self.assertEqual(enc.diff(first, first), b'')
+        self.assertEqual(enc.diff(first, second), b'\x1b[2;3H\x1b[34;40mX')
+        self.assertTrue(enc.keyframe(second).startswith(broadcast.CLEAR))
+
+    def test_late_and_slow_viewers(self):
+        import socket
+        import tempfile
+        import broadcast
+        path = os.path.join(tempfile.mkdtemp(), 'race.sock')
+        caster = broadcast.Broadcaster(path, self._encoder())
+        try:
+            fb = broadcast.FrameBuffer(2, 4)
+            caster.publish(fb.frame())
+            late = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            late.connect(path)
+            fb.addch(0, 0, ord('a'), 3)
+            caster.publish(fb.frame())
+            late.settimeout(1.0)
+            self.assertTrue(late.recv(65536).startswith(broadcast.CLEAR))
+            fb.addch(0, 1, ord('b'), 3)
+            caster.publish(fb.frame())
+            self.assertEqual(late.recv(65536), b'\x1b[1;2H\x1b[37;40mb')
+
+            # a viewer that never reads must not block the broadcaster
+            big = broadcast.FrameBuffer(200, 400)
+            for i in range(20):
+                for y in range(200):
+                    big.addstr(y, 0, chr(ord('a') + i) * 400, 1 + i % 5)
+                caster.publish(big.frame())
+            self.assertGreater(caster.viewers[0].skipped, 0)
+            late.close()
+        finally:
+            caster.close()
+
+
+class TelemetryTests(unittest.TestCase):
+    def test_ring_buffer_window(self):
+        from telemetry import RingBuffer
+        ring = RingBuffer(size=4)
+        for v in range(10):
+            ring.push(float(v))
+        self.assertEqual(sorted(ring.window()), [6.0, 7.0, 8.0, 9.0])
+        self.assertEqual((ring.count, ring.min, ring.max, ring.total), (10, 0.0, 9.0, 45.0))
+
+    def test_ai_wall_hits_and_preallocated_rings(self):
+        from ai import AIPlayer, AIOrchestrator
+        from telemetry import Telemetry
+        tel = Telemetry(racers=3)
+        m = Map(['ooooo', 'o   o', 'ooooo'])
+        # heading east into the right wall
+        ai = AIPlayer(x=17, y=7)
+        ai.angle = math.pi / 2
+        ai.speed = 2
+        orch = AIOrchestrator(Player(), [ai, AIPlayer(x=7, y=7)], tel)
+        for _ in range(5):
+            orch.update(m)
+        self.assertGreaterEqual(tel.wall_hits[1], 1)
+        # rings are allocated up front: health/laps for the player, accel for AI
+        self.assertEqual(sorted(tel.ai_accel), [1, 2])
+        self.assertEqual(sorted(tel.health), [0])
+        self.assertEqual(sorted(tel.lap_times), [0])
+        tel.record_health(0, 90.0)
+        summary = tel.summary()
+        self.assertEqual(summary['racers'][0]['health'], 90.0)
+        self.assertIsNone(summary['racers'][1]['health'])
+        self.assertNotIn('race_racer_health{racer="1"}', tel.prometheus())
+
+    def test_ai_accel_records_only_changes(self):
+        from ai import AIPlayer, AIOrchestrator
+        from telemetry import Telemetry
+        tel = Telemetry(racers=2)
+        m = Map(['oooo', 'o  o', 'oooo'])
+        # the player is far ahead, so the AI speeds up until it hits the cap
+        orch = AIOrchestrator(Player(x=500, y=500), [AIPlayer(x=7, y=7)], tel)
+        for _ in range(10):
+            orch.update(m)
+        self.assertEqual(tel.ai_accel[1].window(), [0.025, 0.03])
+
+    def test_hooks_and_prometheus_endpoint(self):
+        import urllib.request
+        from ai import AIPlayer, AIOrchestrator
+        from telemetry import MetricsServer, Telemetry
+        tel = Telemetry(racers=2)
+        p = Player()
+        self.assertTrue(p.start_boost())
+        self.assertFalse(p.start_boost())
+        m = Map(['oooo', 'o  o', 'oooo'])
+        orch = AIOrchestrator(p, [AIPlayer(x=7, y=7)], tel)
+        orch.update(m)
+        self.assertIsNotNone(tel.ai_accel[1].last)
+        wall = Player(x=1, y=1)
+        game.advance_player(wall, m, {'x': None, 'y': None, 'timer': 0}, -1, tel)
+        self.assertEqual(tel.wall_hits[0], 1)
+        tel.record_frame(0.01)
+        tel.record_floor_cache(30, 10)
+
+        server = MetricsServer(tel)
+        port = server.start()
+        try:
+            url = f'http://127.0.0.1:{port}/metrics'
+            body = urllib.request.urlopen(url, timeout=2).read().decode()
+        finally:
+            server.stop()
+        self.assertIn('race_racer_wall_hits_total{racer="0"} 1', body)
+        self.assertIn('# TYPE race_frame_seconds summary', body)
+        self.assertIn('race_frame_seconds_count 1', body)
+        self.assertIn('race_floor_cache_hits_total 30', body)
+
+
+class ThemeTests(unittest.TestCase):
+    def test_compiled_tables(self):
+        from theme import Theme, cell_index
+        theme = Theme.from_file(os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                                             'themes', 'default.json'))
+        tables = theme.compile(color_pair=lambda n: n * 256)
+        wall = tables.classes['o']
+        idx = cell_index(wall, 0, 0, 0)
+        self.assertEqual((chr(tables.glyphs[idx]), tables.attrs[idx]), ('█', 256))
+        # edge walls get one shade lighter, then blended
+        idx = cell_index(wall, 0, 1, 1)
+        self.assertEqual((chr(tables.glyphs[idx]), tables.attrs[idx]), ('▒', 10 * 256))
+        road_edge = cell_index(0, 0, 1, 0)
+        self.assertEqual(chr(tables.glyphs[road_edge]), '░')
+        # wall strips shade y faces without the floor's edge blend
+        idx = cell_index(wall, 0, 1, 0)
+        self.assertEqual(chr(tables.wall_glyphs[idx]), '▓')
+        idx = cell_index(wall, 3, 1, 1)
+        self.assertEqual((chr(tables.wall_glyphs[idx]), tables.wall_attrs[idx]), ('░', 10 * 256))
+        self.assertEqual(tables.sky_attrs[0][ord('.')], 17 * 256)
+        self.assertEqual(tables.sky_attrs[1][ord('.')], 18 * 256)
+        self.assertEqual(tables.sky_attr(ord('?'), 0), 12 * 256)
+        self.assertEqual(tables.minimap_attrs[tables.classes['=']], 7 * 256)
+
+    def test_invalid_theme(self):
+        from theme import Theme
+        with self.assertRaises(ValueError):
+            Theme({'floor': {'default': {'glyph': ' ', 'pair': 3},
+                             'tiles': {'o': {'shades': ['#'], 'pair': 1}}}})
+
+    def test_draw_scene_with_each_theme(self):
+        compile_themes()
+        m = Map(['oooooo', 'o ~J#o', 'o =  o', 'oooooo'])
+        p = Player(x=12, y=12)
+        for theme in game.THEMES:
+            scr = DummyScreen(height=8, width=12)
+            with patch.object(game.curses, 'color_pair', return_value=0):
+                game.draw_scene(scr, m, p, theme=theme)
+            self.assertTrue(scr.calls)
+
+
+class RaycastTests(unittest.TestCase):
+    def setUp(self):
+        compile_themes()
+
+    def test_cast_ray_hits_wall_face(self):
+        m = Map(['ooooooo', 'o     o', 'ooooooo'])
+        # from the middle of tile (1, 1) facing +x: wall face at tile x=6
+        hit = game.cast_ray(m, 7.5, 7.5, 1.0, 0.0, 100.0, {'o'})
+        self.assertIsNotNone(hit)
+        t, side, ix, iy = hit
+        self.assertAlmostEqual(t, 30 - 7.5)
+        self.assertEqual((side, ix, iy), (0, 6, 1))
+        # facing -y hits the top row on a y face
+        t, side, ix, iy = game.cast_ray(m, 7.5, 7.5, 0.0, -1.0, 100.0, {'o'})
+        self.assertAlmostEqual(t, 2.5)
+        self.assertEqual((side, ix, iy), (1, 1, 0))
+        self.assertIsNone(game.cast_ray(m, 7.5, 7.5, 1.0, 0.0, 10.0, {'o'}))
+
+    def test_near_thin_wall_occludes(self):
+        rows = ['o' * 21] + ['o' + ' ' * 19 + 'o'] * 8 + ['o' + ' ' * 8 + 'ooo' + ' ' * 8 + 'o'] \
+            + ['o' + ' ' * 19 + 'o'] * 3 + ['o' * 21]
+        m = Map(rows)
+        # a one-tile wall 10 units ahead, with open road and the border behind it
+        hit = game.cast_ray(m, 52.5, 60.0, 0.0, -1.0, game.VIEW_DISTANCE, {'o'})
+        self.assertEqual(hit, (10.0, 1, 10, 9))
+        height, width = 24, 40
+        horizon = int(height * game.HORIZON_RATIO)
+        tables = game.THEMES[0].compiled()
+        flash = {'x': None, 'y': None, 'timer': 0}
+        scr = DummyScreen(height=height, width=width)
+        tops, bottoms = game.draw_walls(scr, m, 52.5, 60.0, 0.0, -1.0, 1.0, 0.0,
+                                        height, width, horizon, tables, flash)
+        # the strip runs from its top down to the bottom floor row
+        rows_per_depth = (height - horizon) / game.VIEW_DISTANCE
+        base = height - 10.0 * rows_per_depth
+        self.assertEqual(bottoms[width // 2], height - 2)
+        self.assertEqual(tops[width // 2], int(base - game.WALL_HEIGHT * (height - horizon) / 10.0))
+        drawn = {y for y, x, _ in scr.calls if x == width // 2}
+        self.assertEqual(drawn, set(range(tops[width // 2], height - 1)))
+
+    def test_draw_scene_raycast_in_bounds(self):
+        m = Map(['oooooooo', 'o      o', 'o  oo  o', 'o      o', 'oooooooo'])
+        p = Player(x=20, y=17)
+        for theme in game.THEMES:
+            scr = DummyScreen(height=12, width=20)
+            with patch.object(game.curses, 'color_pair', return_value=0):
+                game.draw_scene(scr, m, p, theme=theme, renderer='raycast')
+            self.assertTrue(scr.calls)
+            for y, x, _ in scr.calls:
+                self.assertLess(y, scr.height)
+                self.assertLess(x, scr.width)
+
+    def test_raycast_leaves_no_floor_row_blank(self):
+        rows = ['o' * 40] + ['o' + ' ' * 38 + 'o' for _ in range(38)] + ['o' * 40]
+        m = Map(rows)
+        # facing the top wall from 65 units away
+        p = Player(x=100, y=70)
+        scr = DummyScreen(height=30, width=80)
+        with patch.object(game.curses, 'color_pair', return_value=0):
+            game.draw_scene(scr, m, p, renderer='raycast')
+        written = {(y, x) for y, x, _ in scr.calls}
+        horizon = int(scr.height * game.HORIZON_RATIO)
+        missing = [(y, x) for y in range(horizon, scr.height - 1)
+                   for x in range(scr.width - 1) if (y, x) not in written]
+        self.assertEqual(missing, [])
+
+
+class FloorCacheTests(unittest.TestCase):
+    def setUp(self):
+        compile_themes(lambda n: n)
+        patcher = patch.object(game.curses, 'color_pair', side_effect=lambda n: n)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def render(self, m, p, flash=None, cache=None):
+        from broadcast import FrameBuffer
+        fb = FrameBuffer(16, 40)
+        game.draw_scene(fb, m, p, flash, floor_cache=cache)
+        # skip the HUD rows, which show the wall clock
+        return fb.frame()[4:]
+
+    def test_matches_full_resample(self):
+        m = Map(['oooooooooo', 'o  J  ~  o', 'o =  B   o', 'o  # H   o', 'o        o', 'oooooooooo'])
+        p = Player(x=25, y=25)
+        cache = game.FloorCache()
+        for tick in range(20):
+            p.y -= 0.4
+            if tick % 5 == 0:
+                p.turn_right()
+            flash = {'x': int(p.x) + 1, 'y': int(p.y) - 6, 'timer': tick % 2}
+            self.assertEqual(self.render(m, p, flash, cache), self.render(m, p, flash))
+        self.assertEqual(cache.full_frames, 1)
+        self.assertGreater(cache.hit_rate, 0.5)
+        self.assertEqual(cache.stats()['hits'], cache.hits)
+
+    def test_full_resample_on_large_move_and_reload(self):
+        m = Map(['oooooo', 'o    o', 'o    o', 'oooooo'])
+        p = Player(x=15, y=15)
+        cache = game.FloorCache()
+        self.render(m, p, cache=cache)
+        self.render(m, p, cache=cache)
+        self.assertEqual((cache.frames, cache.full_frames), (2, 1))
+        self.assertGreater(cache.frame_hits, 0)
+        self.assertEqual(cache.frame_misses, 0)
+        p.angle += 1.0
+        self.render(m, p, cache=cache)
+        self.assertEqual(cache.full_frames, 2)
+        self.assertEqual(cache.frame_hits, 0)
+        m.reload(['oooooo', 'o  B o', 'o    o', 'oooooo'])
+        self.assertEqual(self.render(m, p, cache=cache), self.render(m, p))
+        self.assertEqual(cache.full_frames, 3)
+
+
+class ShardedAITests(unittest.TestCase):
+    def test_matches_in_process_decisions(self):
+        from ai import AIPlayer, AIOrchestrator
+        from ai_workers import ShardedAIOrchestrator
+        rows = ['oooooooooooo', 'o   J    B o', 'o S   #    o', 'o   H ooo  o', 'oooooooooooo']
+
+        def field():
+            return [AIPlayer(x=12 + i * 3, y=11 + i % 3, health=70 + i) for i in range(9)]
+
+        local_map, shard_map = Map(rows), Map(rows)
+        local_ai, shard_ai = field(), field()
+        local = AIOrchestrator(Player(x=12, y=12), local_ai)
+        sharded = ShardedAIOrchestrator(Player(x=12, y=12), shard_ai, shard_map, workers=3)
+        try:
+            for tick in range(60):
+                if tick == 30:
+                    edited = list(rows)
+                    edited[1] = 'o   ooo  B o'
+                    local_map.reload(edited)
+                    shard_map.reload(edited)
+                local.update(local_map)
+                sharded.update(shard_map)
+                self.assertEqual([(a.x, a.y, a.angle, a.speed) for a in local_ai],
+                                 [(a.x, a.y, a.angle, a.speed) for a in shard_ai])
+        finally:
+            sharded.close()
+
+
 if __name__ == '__main__':
     unittest.main()
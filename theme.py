@@ -0,0 +1,171 @@
+"""Data-driven tile styles compiled into flat lookup tables.
+
+A theme file describes how each map tile, sky glyph and minimap cell is
+drawn. :meth:`Theme.compile` turns it into flat lists indexed by tile class
+and cell state, so the renderer resolves a cell with one list index instead
+of a chain of comparisons and a ``color_pair()`` call.
+"""
+import curses
+import glob
+import json
+import os
+
+SHADES = 4
+
+# Tile class flags
+KIND_SHADED = 1   # glyph depends on the viewing angle
+KIND_FLASH = 2    # alternate pair while the wall flash is on this cell
+KIND_CHECKER = 4  # alternate pair on odd world cells
+
+# Characters with a code point below this get a direct sky table slot.
+SKY_TABLE_SIZE = 256
+
+
+# Table entries per tile class: SHADES shades x edge (or face) x alt.
+CLASS_STRIDE = SHADES * 4
+
+
+def cell_index(cls: int, shade: int, edge: int, alt: int) -> int:
+    """Index into :attr:`CompiledTheme.glyphs`/``attrs`` for one floor cell.
+
+    The wall tables share the layout, with the wall face (0 for an x face,
+    1 for a y face) in place of ``edge``.
+    """
+    return cls * CLASS_STRIDE + (shade * 2 + edge) * 2 + alt
+
+
+class CompiledTheme:
+    """Lookup tables produced by :meth:`Theme.compile`."""
+
+    __slots__ = ('classes', 'kinds', 'glyphs', 'attrs', 'wall_glyphs', 'wall_attrs',
+                 'sky_attrs', 'sky_default', 'minimap_attrs', 'player_attr', 'solid')
+
+    def __init__(self):
+        self.classes = {}  # tile char -> class id (0 is the default class)
+        self.kinds = []
+        self.glyphs = []
+        self.attrs = []
+        self.wall_glyphs = []  # raycast wall strips, shaded by distance and face
+        self.wall_attrs = []
+        self.sky_attrs = ([], [])  # per blink phase, indexed by code point
+        self.sky_default = 0
+        self.minimap_attrs = []
+        self.player_attr = 0
+        self.solid = frozenset()  # tile chars the raycaster extrudes as walls
+
+    def sky_attr(self, code: int, phase: int) -> int:
+        if code < SKY_TABLE_SIZE:
+            return self.sky_attrs[phase][code]
+        return self.sky_default
+
+
+class Theme:
+    """Tile glyph, color and blending rules loaded from a theme file."""
+
+    def __init__(self, data: dict, name: str = None):
+        self.name = name or data.get('name', 'theme')
+        self.pairs = {int(k): tuple(v) for k, v in data.get('pairs', {}).items()}
+        floor = data['floor']
+        self.default = floor['default']
+        self.tiles = floor.get('tiles', {})
+        self.blend = floor.get('blend', {})
+        for ch, rule in self.tiles.items():
+            if 'shades' in rule and len(rule['shades']) != SHADES:
+                raise ValueError(f"theme {self.name}: tile {ch!r} needs {SHADES} shades")
+            if 'shades' not in rule and 'glyph' not in rule:
+                raise ValueError(f"theme {self.name}: tile {ch!r} has no glyph")
+        sky = data.get('sky', {})
+        self.sky_default = sky.get('default_pair', 12)
+        self.sky_glyphs = sky.get('glyphs', {})
+        self.sky_blink = sky.get('blink', {})
+        minimap = data.get('minimap', {})
+        self.minimap_default = minimap.get('default_pair', 3)
+        self.minimap_player = minimap.get('player_pair', 2)
+        self.minimap_tiles = minimap.get('tiles', {})
+        self._compiled = None
+
+    @classmethod
+    def from_file(cls, path: str) -> 'Theme':
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        name = data.get('name') or os.path.splitext(os.path.basename(path))[0]
+        return cls(data, name)
+
+    def compile(self, color_pair=None) -> CompiledTheme:
+        """Build the lookup tables and keep them for :meth:`compiled`.
+
+        ``color_pair`` maps a pair number to an attribute and defaults to
+        ``curses.color_pair``, so curses must be initialised first.
+        """
+        color_pair = color_pair or curses.color_pair
+        out = CompiledTheme()
+        rules = [self.default]
+        for ch, rule in self.tiles.items():
+            out.classes[ch] = len(rules)
+            rules.append(rule)
+
+        for rule in rules:
+            kind = 0
+            if 'shades' in rule:
+                kind |= KIND_SHADED
+            if 'flash_pair' in rule:
+                kind |= KIND_FLASH
+            elif 'alt_pair' in rule:
+                kind |= KIND_CHECKER
+            out.kinds.append(kind)
+            shades = rule.get('shades')
+            pair = color_pair(rule['pair'])
+            alt = color_pair(rule.get('flash_pair', rule.get('alt_pair', rule['pair'])))
+            for shade in range(SHADES):
+                for edge in (0, 1):
+                    if shades:
+                        # walls next to other tiles read one shade lighter
+                        glyph = shades[min(shade + edge, SHADES - 1)]
+                    else:
+                        glyph = rule['glyph']
+                    if edge:
+                        glyph = self.blend.get(glyph, glyph)
+                    out.glyphs.extend((ord(glyph), ord(glyph)))
+                    out.attrs.extend((pair, alt))
+            for shade in range(SHADES):
+                for face in (0, 1):
+                    # y faces read one shade further away than x faces
+                    glyph = shades[min(shade + face, SHADES - 1)] if shades else rule['glyph']
+                    out.wall_glyphs.extend((ord(glyph), ord(glyph)))
+                    out.wall_attrs.extend((pair, alt))
+
+        out.sky_default = color_pair(self.sky_default)
+        for phase in (0, 1):
+            table = [out.sky_default] * SKY_TABLE_SIZE
+            for ch, pair in self.sky_glyphs.items():
+                if ord(ch) < SKY_TABLE_SIZE:
+                    table[ord(ch)] = color_pair(pair)
+            for ch, pairs in self.sky_blink.items():
+                if ord(ch) < SKY_TABLE_SIZE:
+                    table[ord(ch)] = color_pair(pairs[phase])
+            out.sky_attrs[phase].extend(table)
+
+        default_mini = color_pair(self.minimap_default)
+        out.minimap_attrs = [default_mini] * len(rules)
+        for ch, pair in self.minimap_tiles.items():
+            cls = out.classes.get(ch)
+            if cls is not None:
+                out.minimap_attrs[cls] = color_pair(pair)
+        out.player_attr = color_pair(self.minimap_player)
+        out.solid = frozenset(ch for ch, rule in self.tiles.items() if rule.get('solid'))
+        self._compiled = out
+        return out
+
+    def compiled(self) -> CompiledTheme:
+        """Return the tables from the last :meth:`compile`, compiling on first use."""
+        if self._compiled is None:
+            self.compile()
+        return self._compiled
+
+
+def load_themes(directory: str) -> list:
+    """Load every ``*.json`` theme in ``directory``, ``default`` first."""
+    paths = sorted(glob.glob(os.path.join(directory, '*.json')))
+    themes = [Theme.from_file(p) for p in paths]
+    themes.sort(key=lambda t: t.name != 'default')
+    return themes
@@ -1,5 +1,14 @@
+import bisect
 import random
-from collections import deque
+from collections import OrderedDict
+
+# Horizontal offset change per tick while on a curved segment.
+CURVE_STEP = 0.02
+# Segments generated together; each block has its own seeded RNG.
+BLOCK_SIZE = 64
+# Blocks of segments kept in memory; older ones are regenerated on demand.
+MAX_BLOCKS = 8
+
 
 class TrackSegment:
     """Represents a portion of the track with constant curvature."""
@@ -9,29 +18,118 @@ class TrackSegment:
         self.length = length
 
 
-def segment_generator():
-    """Yield endless random track segments."""
+def segment_generator(rng=None):
+    """Yield endless random track segments drawn from ``rng``."""
+    rng = rng or random
     while True:
-        curve = random.choice([-1, -1, 0, 0, 0, 1, 1])
-        length = random.randint(5, 15)
+        curve = rng.choice([-1, -1, 0, 0, 0, 1, 1])
+        length = rng.randint(5, 15)
         yield TrackSegment(curve, length)
 
 
+def _clamp(offset: float) -> float:
+    return max(min(offset, 1.0), -1.0)
+
+
+class _Block:
+    """A run of segments with the tick and offset at which each one starts."""
+
+    __slots__ = ('segments', 'starts', 'offsets', 'end_tick', 'end_offset')
+
+    def __init__(self, segments, start_tick, start_offset):
+        self.segments = segments
+        self.starts = []
+        self.offsets = []
+        tick, offset = start_tick, start_offset
+        for seg in segments:
+            self.starts.append(tick)
+            self.offsets.append(offset)
+            tick += seg.length
+            offset = _clamp(offset + seg.curve * CURVE_STEP * seg.length)
+        self.end_tick = tick
+        self.end_offset = offset
+
+
 class Track:
-    def __init__(self):
-        self._segments = deque()
-        self._gen = segment_generator()
-        self._current = next(self._gen)
-        self._timer = self._current.length
+    """Seeded procedural track that can be queried at any tick.
+
+    Segments are generated in blocks from a per-block RNG, so any block can
+    be rebuilt from the seed alone. A prefix index of block start ticks and
+    offsets (two numbers per block) locates a tick in O(log n); only the
+    ``max_blocks`` most recently used blocks of segments stay in memory.
+    """
+
+    def __init__(self, seed=None, block_size: int = BLOCK_SIZE, max_blocks: int = MAX_BLOCKS):
+        self.seed = random.randrange(2 ** 32) if seed is None else seed
+        self.block_size = block_size
+        self.max_blocks = max_blocks
+        self._block_ticks = [0]
+        self._block_offsets = [0.0]
+        self._blocks = OrderedDict()
+        self.tick = 0
         self.offset = 0.0
 
+    def _generate(self, index: int) -> _Block:
+        rng = random.Random(f'{self.seed}:{index}')
+        gen = segment_generator(rng)
+        segments = [next(gen) for _ in range(self.block_size)]
+        return _Block(segments, self._block_ticks[index], self._block_offsets[index])
+
+    def _block(self, index: int) -> _Block:
+        block = self._blocks.get(index)
+        if block is not None:
+            self._blocks.move_to_end(index)
+            return block
+        block = self._generate(index)
+        self._blocks[index] = block
+        if len(self._blocks) > self.max_blocks:
+            self._blocks.popitem(last=False)
+        return block
+
+    def _locate(self, tick: int):
+        """Return ``(block, segment index)`` for the segment active at ``tick``."""
+        if tick < 0:
+            raise ValueError("tick must be non-negative")
+        while self._block_ticks[-1] <= tick:
+            block = self._block(len(self._block_ticks) - 1)
+            self._block_ticks.append(block.end_tick)
+            self._block_offsets.append(block.end_offset)
+        block = self._block(bisect.bisect_right(self._block_ticks, tick) - 1)
+        return block, bisect.bisect_right(block.starts, tick) - 1
+
+    def segment_at(self, tick: int) -> TrackSegment:
+        block, idx = self._locate(tick)
+        return block.segments[idx]
+
+    def offset_at(self, tick: int) -> float:
+        """Return the horizontal offset after ``tick`` updates."""
+        block, idx = self._locate(tick)
+        seg = block.segments[idx]
+        elapsed = tick - block.starts[idx]
+        # a segment curves one way only, so clamping once equals clamping per tick
+        return _clamp(block.offsets[idx] + seg.curve * CURVE_STEP * elapsed)
+
+    def segments_between(self, start: int, end: int) -> list:
+        """Return ``(start tick, segment)`` for every segment overlapping ``[start, end)``."""
+        if end <= start:
+            return []
+        block, idx = self._locate(start)
+        result = []
+        while True:
+            while idx < len(block.segments):
+                seg_start = block.starts[idx]
+                if seg_start >= end:
+                    return result
+                result.append((seg_start, block.segments[idx]))
+                idx += 1
+            block, idx = self._locate(block.end_tick)
+
+    def seek(self, tick: int) -> float:
+        """Jump to ``tick`` and return the offset there."""
+        self.tick = tick
+        self.offset = self.offset_at(tick)
+        return self.offset
+
     def update(self) -> float:
         """Advance the track state and return the current horizontal offset."""
-        if self._timer <= 0:
-            self._current = next(self._gen)
-            self._timer = self._current.length
-        self.offset += self._current.curve * 0.02
-        self._timer -= 1
-        # Clamp offset to reasonable range
-        self.offset = max(min(self.offset, 1.0), -1.0)
-        return self.offset
+        return self.seek(self.tick + 1)